@@ -1,33 +1,363 @@
-from db_manager import DatabaseManager
-from datetime import datetime, timedelta
+from .db_manager import DatabaseManager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+ENGAGEMENT = {'$add': ['$metrics.likes', '$metrics.retweets', '$metrics.replies']}
+
+# Only the fields the pipelines read, so embedded threads/comments never leave the index scan
+METRICS_PROJECTION = {
+    '_id': 0,
+    'author.username': 1,
+    'timestamp': 1,
+    'metrics.likes': 1,
+    'metrics.retweets': 1,
+    'metrics.replies': 1,
+}
+
+# Snapshot fields in the tweet_metrics time-series collection
+SNAPSHOT_METRICS = ('likes', 'retweets', 'replies')
+HISTORY_UNITS = ('hour', 'day')
+
+# Fields of a leaderboard row it can be ranked by
+LEADERBOARD_SORTS = ('tweet_count', 'total_likes', 'total_retweets', 'total_replies',
+                     'total_engagement', 'avg_engagement')
+
+# get_user_stats returns exactly these keys whichever path answers; None where a value isn't known
+USER_STATS_FIELDS = (
+    'username', 'tweet_count', 'total_likes', 'total_retweets', 'total_replies',
+    'avg_likes', 'avg_retweets', 'avg_replies', 'max_likes',
+    'first_tweet_at', 'last_tweet_at', 'total_engagement',
+)
+
 
 class TweetAnalyzer:
-    def __init__(self):
-        self.db = DatabaseManager()
-    
-    def get_user_stats(self, username: str):
-        """Get basic stats for a user's tweets"""
-        tweets = self.db.get_tweets_by_username(username)
-        
-        if not tweets:
+    """Profile statistics computed server-side with MongoDB aggregation pipelines"""
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        self.db = db_manager or DatabaseManager()
+
+    def _match(self, usernames=None, since: Optional[datetime] = None) -> Dict:
+        match = {}
+        if isinstance(usernames, str):
+            match['author.username'] = usernames
+        elif usernames:
+            match['author.username'] = {'$in': list(usernames)}
+        if since:
+            match['timestamp'] = {'$gte': since}
+        return match
+
+    def get_user_stats(self, username: str, exact: bool = False) -> Optional[Dict]:
+        """Tweet count, metric averages and totals for a user.
+
+        Reads the counters save_tweets maintains on the profile; ``exact``
+        (or a profile without counters) aggregates over the tweets instead.
+        """
+        if not exact:
+            profile = self.db.get_profile_stats(username)
+            if profile:
+                return self._stats_from_profile(username, profile['stats'])
+
+        pipeline = [
+            {'$match': self._match(username)},
+            {'$project': METRICS_PROJECTION},
+            {'$group': {
+                '_id': None,
+                'tweet_count': {'$sum': 1},
+                'total_likes': {'$sum': '$metrics.likes'},
+                'total_retweets': {'$sum': '$metrics.retweets'},
+                'total_replies': {'$sum': '$metrics.replies'},
+                'avg_likes': {'$avg': '$metrics.likes'},
+                'avg_retweets': {'$avg': '$metrics.retweets'},
+                'avg_replies': {'$avg': '$metrics.replies'},
+                'max_likes': {'$max': '$metrics.likes'},
+                'first_tweet_at': {'$min': '$timestamp'},
+                'last_tweet_at': {'$max': '$timestamp'},
+            }},
+            {'$project': {'_id': 0}},
+        ]
+        result = next(self.db.tweets.aggregate(pipeline), None)
+        if not result:
             return None
-            
-        total_likes = sum(t['metrics']['likes'] for t in tweets)
-        total_retweets = sum(t['metrics']['retweets'] for t in tweets)
-        total_replies = sum(t['metrics']['replies'] for t in tweets)
-        
+
+        result['username'] = username
+        result['total_engagement'] = result['total_likes'] + result['total_retweets'] + result['total_replies']
+        return {field: result.get(field) for field in USER_STATS_FIELDS}
+
+    @staticmethod
+    def _stats_from_profile(username: str, stats: Dict) -> Dict:
+        count = stats.get('tweet_count', 0)
+        totals = {f'total_{metric}': stats.get(metric, 0) for metric in ('likes', 'retweets', 'replies')}
+        result = {
+            'username': username,
+            'tweet_count': count,
+            **totals,
+            'avg_likes': totals['total_likes'] / count if count else None,
+            'avg_retweets': totals['total_retweets'] / count if count else None,
+            'avg_replies': totals['total_replies'] / count if count else None,
+            'first_tweet_at': stats.get('first_tweet_at'),
+            'last_tweet_at': stats.get('last_tweet_at'),
+            'total_engagement': sum(totals.values()),
+        }
+        # Counters are running sums, so a maximum can't be kept; max_likes needs exact=True
+        return {field: result.get(field) for field in USER_STATS_FIELDS}
+
+    def get_leaderboard(self, usernames: Optional[List[str]] = None, sort_by: str = 'total_engagement',
+                        limit: int = 20) -> List[Dict]:
+        """Users ranked by engagement (or any other returned field), one grouped query for all of them"""
+        if sort_by not in LEADERBOARD_SORTS:
+            raise ValueError(f"sort_by must be one of {LEADERBOARD_SORTS}, got {sort_by!r}")
+        pipeline = [
+            {'$match': self._match(usernames)},
+            {'$project': METRICS_PROJECTION},
+            {'$group': {
+                '_id': '$author.username',
+                'tweet_count': {'$sum': 1},
+                'total_likes': {'$sum': '$metrics.likes'},
+                'total_retweets': {'$sum': '$metrics.retweets'},
+                'total_replies': {'$sum': '$metrics.replies'},
+                'total_engagement': {'$sum': ENGAGEMENT},
+                'avg_engagement': {'$avg': ENGAGEMENT},
+            }},
+            {'$sort': {sort_by: -1, '_id': 1}},
+            {'$limit': limit},
+            {'$project': {
+                '_id': 0,
+                'username': '$_id',
+                'tweet_count': 1,
+                'total_likes': 1,
+                'total_retweets': 1,
+                'total_replies': 1,
+                'total_engagement': 1,
+                'avg_engagement': 1,
+            }},
+        ]
+        return list(self.db.tweets.aggregate(pipeline))
+
+    def get_engagement_percentiles(self, username: Optional[str] = None,
+                                   percentiles=(0.5, 0.9, 0.99)) -> Dict[str, Dict[str, float]]:
+        """Percentiles of likes, retweets, replies and total engagement per tweet (MongoDB 7.0+)"""
+        p = list(percentiles)
+
+        def percentile(expression):
+            return {'$percentile': {'input': expression, 'p': p, 'method': 'approximate'}}
+
+        pipeline = [
+            {'$match': self._match(username)},
+            {'$project': METRICS_PROJECTION},
+            {'$group': {
+                '_id': None,
+                'tweets': {'$sum': 1},
+                'likes': percentile('$metrics.likes'),
+                'retweets': percentile('$metrics.retweets'),
+                'replies': percentile('$metrics.replies'),
+                'engagement': percentile(ENGAGEMENT),
+            }},
+        ]
+        result = next(self.db.tweets.aggregate(pipeline), None)
+        if not result:
+            return {}
+
+        labels = [f"p{round(q * 100, 1):g}" for q in p]
+        stats = {'tweets': result['tweets']}
+        for metric in ('likes', 'retweets', 'replies', 'engagement'):
+            stats[metric] = dict(zip(labels, result[metric]))
+        return stats
+
+    def get_daily_activity(self, username: Optional[str] = None, days: int = 30) -> List[Dict]:
+        """Tweets and engagement per calendar day (UTC) over the last N days"""
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        pipeline = [
+            {'$match': self._match(username, since)},
+            {'$project': METRICS_PROJECTION},
+            {'$group': {
+                '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}},
+                'tweets': {'$sum': 1},
+                'likes': {'$sum': '$metrics.likes'},
+                'retweets': {'$sum': '$metrics.retweets'},
+                'replies': {'$sum': '$metrics.replies'},
+                'engagement': {'$sum': ENGAGEMENT},
+            }},
+            {'$sort': {'_id': 1}},
+            {'$project': {'_id': 0, 'day': '$_id', 'tweets': 1, 'likes': 1, 'retweets': 1,
+                          'replies': 1, 'engagement': 1}},
+        ]
+        return list(self.db.tweets.aggregate(pipeline))
+
+    def get_profile_overview(self, username: str, top: int = 5, days: int = 30) -> Dict:
+        """Totals, top tweets and daily activity for one user from a single $facet query"""
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        pipeline = [
+            {'$match': self._match(username)},
+            {'$project': dict(METRICS_PROJECTION, tweet_id=1, engagement=ENGAGEMENT)},
+            {'$facet': {
+                'totals': [
+                    {'$group': {
+                        '_id': None,
+                        'tweet_count': {'$sum': 1},
+                        'total_engagement': {'$sum': '$engagement'},
+                        'avg_engagement': {'$avg': '$engagement'},
+                    }},
+                    {'$project': {'_id': 0}},
+                ],
+                'top_tweets': [
+                    {'$sort': {'engagement': -1}},
+                    {'$limit': top},
+                    {'$project': {'tweet_id': 1, 'engagement': 1, 'timestamp': 1}},
+                ],
+                'daily': [
+                    {'$match': {'timestamp': {'$gte': since}}},
+                    {'$group': {
+                        '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}},
+                        'tweets': {'$sum': 1},
+                        'engagement': {'$sum': '$engagement'},
+                    }},
+                    {'$sort': {'_id': 1}},
+                ],
+            }},
+        ]
+        result = next(self.db.tweets.aggregate(pipeline), {})
+        totals = result.get('totals') or [{}]
         return {
             'username': username,
-            'tweet_count': len(tweets),
-            'avg_likes': total_likes / len(tweets),
-            'avg_retweets': total_retweets / len(tweets),
-            'avg_replies': total_replies / len(tweets),
-            'total_engagement': total_likes + total_retweets + total_replies
+            **totals[0],
+            'top_tweets': result.get('top_tweets', []),
+            'daily': [{'day': row['_id'], 'tweets': row['tweets'], 'engagement': row['engagement']}
+                      for row in result.get('daily', [])],
         }
-    
-    def get_recent_activity(self, days: int = 7):
-        """Get tweet activity for the last N days"""
-        end_date = datetime.now()
+
+    def _history_match(self, tweet_id: Optional[str] = None, username: Optional[str] = None,
+                       since: Optional[datetime] = None) -> Dict:
+        match = {}
+        if tweet_id:
+            match['tweet.tweet_id'] = tweet_id
+        if username:
+            match['tweet.username'] = username
+        if since:
+            match['observed_at'] = {'$gte': since}
+        return match
+
+    @staticmethod
+    def _downsample(unit: str, group_key) -> List[Dict]:
+        """Stages keeping the last snapshot of each group per hour/day, time-sorted first"""
+        if unit not in HISTORY_UNITS:
+            raise ValueError(f"unit must be one of {HISTORY_UNITS}, got {unit!r}")
+        return [
+            {'$sort': {'observed_at': 1}},
+            {'$group': {
+                '_id': dict(group_key, bucket={'$dateTrunc': {'date': '$observed_at', 'unit': unit}}),
+                **{metric: {'$last': f'${metric}'} for metric in SNAPSHOT_METRICS},
+                'snapshots': {'$sum': 1},
+            }},
+        ]
+
+    @staticmethod
+    def _with_growth(unit: str) -> List[Dict]:
+        """Per-bucket growth (change per hour/day since the previous bucket) plus output shaping"""
+        return [
+            {'$sort': {'bucket': 1}},
+            {'$setWindowFields': {
+                'sortBy': {'bucket': 1},
+                'output': {
+                    f'{metric}_growth': {
+                        '$derivative': {'input': f'${metric}', 'unit': unit},
+                        'window': {'documents': [-1, 0]},
+                    }
+                    for metric in SNAPSHOT_METRICS
+                },
+            }},
+            {'$project': {'_id': 0}},
+        ]
+
+    def get_metric_history(self, tweet_id: str, unit: str = 'hour',
+                           since: Optional[datetime] = None) -> List[Dict]:
+        """A tweet's engagement curve: last observed counts per hour or day, with growth per unit"""
+        pipeline = [
+            {'$match': self._history_match(tweet_id=tweet_id, since=since)},
+            *self._downsample(unit, {}),
+            {'$project': {'bucket': '$_id.bucket', 'snapshots': 1,
+                          **{metric: 1 for metric in SNAPSHOT_METRICS}}},
+            *self._with_growth(unit),
+        ]
+        return list(self.db.tweet_metrics.aggregate(pipeline))
+
+    def get_profile_history(self, username: str, unit: str = 'day',
+                            since: Optional[datetime] = None) -> List[Dict]:
+        """Summed engagement of a user's tweets per hour or day, over the tweets observed in each bucket"""
+        pipeline = [
+            {'$match': self._history_match(username=username, since=since)},
+            *self._downsample(unit, {'tweet_id': '$tweet.tweet_id'}),
+            {'$group': {
+                '_id': '$_id.bucket',
+                'tweets': {'$sum': 1},
+                **{metric: {'$sum': f'${metric}'} for metric in SNAPSHOT_METRICS},
+            }},
+            {'$project': {'bucket': '$_id', 'tweets': 1, **{metric: 1 for metric in SNAPSHOT_METRICS}}},
+            *self._with_growth(unit),
+        ]
+        return list(self.db.tweet_metrics.aggregate(pipeline))
+
+    def get_growth_rates(self, username: Optional[str] = None, hours: int = 24,
+                         sort_by: str = 'likes', limit: int = 20) -> List[Dict]:
+        """Fastest-growing tweets over the last N hours: gain and gain per hour between first and last snapshot"""
+        if sort_by not in SNAPSHOT_METRICS:
+            raise ValueError(f"sort_by must be one of {SNAPSHOT_METRICS}, got {sort_by!r}")
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        elapsed_hours = {'$divide': [{'$subtract': ['$last_at', '$first_at']}, 3600 * 1000]}
+        pipeline = [
+            {'$match': self._history_match(username=username, since=since)},
+            {'$sort': {'observed_at': 1}},
+            {'$group': {
+                '_id': '$tweet.tweet_id',
+                'username': {'$first': '$tweet.username'},
+                'first_at': {'$first': '$observed_at'},
+                'last_at': {'$last': '$observed_at'},
+                'snapshots': {'$sum': 1},
+                **{f'first_{metric}': {'$first': f'${metric}'} for metric in SNAPSHOT_METRICS},
+                **{metric: {'$last': f'${metric}'} for metric in SNAPSHOT_METRICS},
+            }},
+            {'$match': {'snapshots': {'$gte': 2}}},
+            {'$set': {'hours': elapsed_hours}},
+            {'$set': {
+                **{f'{metric}_gain': {'$subtract': [f'${metric}', f'$first_{metric}']}
+                   for metric in SNAPSHOT_METRICS},
+            }},
+            {'$set': {
+                **{f'{metric}_per_hour': {'$cond': [{'$gt': ['$hours', 0]},
+                                                    {'$divide': [f'${metric}_gain', '$hours']}, None]}
+                   for metric in SNAPSHOT_METRICS},
+            }},
+            {'$sort': {f'{sort_by}_gain': -1, '_id': 1}},
+            {'$limit': limit},
+            {'$project': {
+                '_id': 0,
+                'tweet_id': '$_id',
+                'username': 1,
+                'first_at': 1,
+                'last_at': 1,
+                'hours': 1,
+                'snapshots': 1,
+                **{metric: 1 for metric in SNAPSHOT_METRICS},
+                **{f'{metric}_gain': 1 for metric in SNAPSHOT_METRICS},
+                **{f'{metric}_per_hour': 1 for metric in SNAPSHOT_METRICS},
+            }},
+        ]
+        return list(self.db.tweet_metrics.aggregate(pipeline))
+
+    def search(self, query: str, username: Optional[str] = None, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, page: int = 1, page_size: int = 20,
+               comments: bool = False, local: bool = False) -> List[Dict]:
+        """Keyword search ranked by relevance, via the MongoDB text index or the local FTS index"""
+        if not local:
+            return self.db.search_tweets(query, username, since, until, page, page_size, comments)
+        if not self.db.search_index:
+            raise ValueError("No local search index configured, set SEARCH_INDEX_PATH")
+        kinds = ('comment',) if comments else ('tweet',)
+        return self.db.search_index.search(query, username, since, until, kinds, page, page_size)
+
+    def get_recent_activity(self, days: int = 7, username: Optional[str] = None, limit: int = 0):
+        """Get tweet activity for the last N days, optionally for one user"""
+        # Stored timestamps are UTC
+        end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=days)
-        
-        return self.db.get_tweets_by_date_range(start_date, end_date) 
\ No newline at end of file
+
+        return self.db.get_tweets_by_date_range(start_date, end_date, username, limit)
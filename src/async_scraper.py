@@ -0,0 +1,785 @@
+from playwright.async_api import async_playwright
+import asyncio
+import time
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import deque
+from pathlib import Path
+from .proxy_manager import ProxyManager
+from .db_manager import DatabaseManager
+from .browser_pool import BrowserPool
+from .extraction import (
+    TWEET_TEXT_JS, BATCH_EXTRACT_JS, parse_datetime_attr, parse_metric, snowflake_time, tweet_from_entry
+)
+from .timeline_parser import ResponseCapture
+from .detail_queue import DetailFetchQueue
+from .resource_policy import ResourcePolicy, TrafficMonitor
+from .write_behind import WriteBehindSink
+from .checkpoint import ProfileCheckpoint
+from .timing import TimingPolicy
+from .rate_limiter import RequestScheduler
+
+# Rendered once a profile page has loaded, whatever state the account is in
+PAGE_STATE_SELECTOR = '[data-testid="primaryColumn"], [data-testid="emptyState"], [data-testid="error"]'
+
+SHOW_MORE_SELECTOR = '[data-testid="tweet-text-show-more-link"]'
+
+class AsyncTwitterScraper:
+    """asyncio scraping engine that runs several profiles over pooled browsers"""
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None,
+                 proxy_manager: Optional[ProxyManager] = None,
+                 max_concurrency: int = 3, headless: bool = True,
+                 pool_options: Optional[Dict] = None, extraction_mode: str = 'batch',
+                 base_url: str = "https://twitter.com", comment_limit: int = 5,
+                 detail_workers: int = 2, detail_queue_size: int = 20,
+                 resource_policy: Optional[ResourcePolicy] = None,
+                 flush_every: int = 100, flush_interval: float = 30.0,
+                 incremental: bool = True, stop_after_known: int = 5,
+                 checkpoint_store=None, timing_policy: Optional[TimingPolicy] = None,
+                 scheduler: Optional[RequestScheduler] = None):
+        self.db_manager = db_manager or DatabaseManager()
+        self.proxy_manager = proxy_manager or ProxyManager()
+        self.user_agents = [
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+        ]
+        self.max_concurrency = max_concurrency
+        # 'batch' reads all new articles in one page.evaluate, 'dom' walks element handles,
+        # 'network' parses the timeline API responses the page downloads anyway
+        self.extraction_mode = extraction_mode
+        self.base_url = base_url.rstrip('/')
+        # Replies fetched per tweet, 0 skips the comment pass
+        self.comment_limit = comment_limit
+        # Reusable pages that expand truncated previews alongside timeline scrolling
+        self.detail_workers = detail_workers
+        self.detail_queue_size = detail_queue_size
+        # Blocks images/video/fonts/trackers by default; pass ResourcePolicy.full() to load everything
+        self.resource_policy = resource_policy or ResourcePolicy.lightweight()
+        self._monitors = {}
+        # Write-behind persistence: flush every N tweets or T seconds, whichever comes first
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        # Stop scrolling after this many consecutive already-stored tweets
+        self.incremental = incremental
+        self.stop_after_known = stop_after_known
+        # FileCheckpointStore or MongoCheckpointStore; None disables resume
+        self.checkpoint_store = checkpoint_store
+        # Event-driven waits plus jitter; TimingPolicy.fast() for fixture runs
+        self.timing = timing_policy or TimingPolicy.default()
+        # Per-proxy token buckets every navigation draws from; may be shared between engines
+        self.scheduler = scheduler or RequestScheduler()
+        self.traffic_stats: Dict[str, Dict] = {}
+        # Why a profile's last scrape ended early, for callers that retry (e.g. the job queue)
+        self.profile_errors: Dict[str, str] = {}
+        self.headless = headless
+        # Extra BrowserPool settings, e.g. max_pages_per_browser / max_memory_mb
+        self.pool_options = pool_options or {}
+        self.pool = None
+        self._playwright = None
+        self.setup_logging()
+
+    def setup_logging(self):
+        log_dir = Path("logs")
+        log_dir.mkdir(exist_ok=True)
+
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(log_dir / "scraper.log"),
+                logging.StreamHandler()
+            ]
+        )
+
+    async def start(self):
+        """Start Playwright and the browser pool so browsers outlive single profiles"""
+        if self.pool is None:
+            self._playwright = await async_playwright().start()
+            self.pool = BrowserPool(
+                self._playwright,
+                self.proxy_manager,
+                self.user_agents,
+                headless=self.headless,
+                **self.pool_options
+            )
+        return self
+
+    async def close(self):
+        if self.pool is not None:
+            logging.info(f"Browser pool stats: {self.pool.get_stats()}")
+            logging.info(f"Wait stats: {self.timing.get_stats()}")
+            logging.info(f"Request scheduler stats: {self.scheduler.get_stats()}")
+            logging.info(f"Proxy stats: {self.proxy_manager.get_stats()}")
+            await self.pool.close()
+            self.pool = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _goto(self, page, url: str):
+        """Navigate a page once its proxy has a free request slot, timing it against the profile's traffic monitor"""
+        key = self.pool.proxy_key(page.context)
+        await self.scheduler.acquire(key)
+        if self.scheduler.rotation_due(key):
+            # The context in hand keeps working. Later contexts come from another proxy while this
+            # one rests; with no other proxy to take over, only the browser session is refreshed
+            # and the exit IP stays the same
+            if self.proxy_manager.rest(key):
+                logging.info(f"Rotating away from {key} after {self.scheduler.rotate_every} requests")
+            self.pool.retire(key)
+            self.scheduler.mark_rotated(key)
+
+        started = time.monotonic()
+        try:
+            response = await page.goto(url)
+        except Exception as e:
+            self.proxy_manager.report_failure(key, reason=str(e).splitlines()[0])
+            raise
+        if response is not None and response.status == 429:
+            self.proxy_manager.report_failure(key, ban=True, reason="HTTP 429")
+        else:
+            self.proxy_manager.report_success(key, time.monotonic() - started)
+        monitor = self._monitors.get(page.context)
+        if monitor:
+            monitor.record_navigation(started)
+        return response
+
+    async def extract_tweet_data(self, tweet_element, context=None) -> Optional[Dict]:
+        try:
+            # Get tweet ID and URL
+            tweet_url = None
+            tweet_link = await tweet_element.query_selector('a[href*="/status/"]')
+            if tweet_link:
+                tweet_url = await tweet_link.get_attribute('href')
+                tweet_id = tweet_url.split('/status/')[1]
+            else:
+                tweet_id = (
+                    await tweet_element.get_attribute('data-tweet-id') or
+                    await tweet_element.get_attribute('data-item-id')
+                )
+
+            if not tweet_id:
+                logging.warning("Could not extract tweet ID")
+                return None
+
+            # The preview is complete unless Twitter shows its "Show more" marker
+            truncated = bool(await tweet_element.query_selector('[data-testid="tweet-text-show-more-link"]'))
+
+            full_content = None
+            if truncated and tweet_url and context:
+                full_content = await self._fetch_full_text(context, tweet_url)
+                truncated = not full_content
+
+            # Use the preview content when it is complete or the detail fetch failed
+            if not full_content:
+                text_element = await tweet_element.query_selector('[data-testid="tweetText"]')
+                if text_element:
+                    full_content = await text_element.evaluate(TWEET_TEXT_JS)
+
+            if not full_content:
+                return None
+
+            time_element = (
+                await tweet_element.query_selector('a[href*="/status/"] time[datetime]') or
+                await tweet_element.query_selector('time[datetime]')
+            )
+            timestamp = parse_datetime_attr(await time_element.get_attribute('datetime')) if time_element else None
+
+            return {
+                'id': tweet_id,
+                'url': tweet_url,
+                'author': tweet_url.split('/')[1] if tweet_url else None,
+                'text': full_content.strip(),
+                'truncated': truncated,
+                'likes': await self._get_metric(tweet_element, 'like'),
+                'retweets': await self._get_metric(tweet_element, 'retweet'),
+                'replies': await self._get_metric(tweet_element, 'reply'),
+                'timestamp': timestamp or snowflake_time(tweet_id)
+            }
+        except Exception as e:
+            logging.error(f"Error extracting tweet data: {str(e)}")
+            return None
+
+    async def _fetch_full_text(self, context, tweet_url: str) -> Optional[str]:
+        """Read a tweet's expanded text on a throwaway page"""
+        tweet_page = await context.new_page()
+        try:
+            return await self._read_full_text(tweet_page, tweet_url)
+        finally:
+            await tweet_page.close()
+
+    async def _read_full_text(self, tweet_page, tweet_url: str) -> Optional[str]:
+        """Navigate a (reusable) page to the tweet's status URL and read its expanded text"""
+        try:
+            await self._goto(tweet_page, f"{self.base_url}{tweet_url}")
+            await self.timing.wait_for_selector(tweet_page, '[data-testid="tweetText"]', name='detail')
+            await self.timing.jitter('detail')
+            return await self._expand_status_text(tweet_page)
+        except Exception as e:
+            logging.error(f"Error getting full tweet content: {str(e)}")
+            return None
+
+    async def _expand_status_text(self, page) -> Optional[str]:
+        """Expanded text of the focal tweet on an already loaded status page"""
+        # Try to expand the tweet content
+        try:
+            show_more = await page.query_selector(SHOW_MORE_SELECTOR)
+            if show_more:
+                await show_more.click()
+                # Expanding swaps the link for the rest of the text
+                await self.timing.wait_for_selector(page, SHOW_MORE_SELECTOR, name='detail.expand', state='detached')
+        except Exception:
+            pass
+
+        # The focal tweet is the first one on its status page
+        text_element = await page.query_selector('[data-testid="tweetText"]')
+        if text_element:
+            return await text_element.evaluate(TWEET_TEXT_JS)
+        return None
+
+    async def _extract_batch(self, page) -> List[Dict]:
+        """Read every new tweet article on the page in a single evaluate call"""
+        try:
+            return await page.evaluate(BATCH_EXTRACT_JS)
+        except Exception as e:
+            logging.error(f"Error during batch extraction: {str(e)}")
+            return []
+
+    async def _collect_batch(self, page, tweets_seen: set) -> List[Dict]:
+        """New tweets on the page via one roundtrip, metrics parsed in Python"""
+        collected = []
+        for entry in await self._extract_batch(page):
+            if entry['id'] in tweets_seen:
+                continue
+            tweets_seen.add(entry['id'])
+            logging.info(f"Processing tweet {entry['id']}")
+
+            tweet_data = tweet_from_entry(entry)
+            if tweet_data:
+                collected.append(tweet_data)
+        return collected
+
+    async def _collect_dom(self, page, tweets_seen: set) -> List[Dict]:
+        """New tweets on the page read one element handle at a time"""
+        collected = []
+        # Try different selectors for tweets
+        tweet_elements = await page.query_selector_all('article[data-testid="tweet"], div[data-testid="tweet"]')
+        logging.info(f"Found {len(tweet_elements)} tweets on page")
+
+        for tweet in tweet_elements:
+            try:
+                # Try different ways to get the tweet ID
+                tweet_id = (
+                    await tweet.get_attribute('data-tweet-id') or
+                    await tweet.get_attribute('data-item-id')
+                )
+                if not tweet_id:
+                    status_link = await tweet.query_selector('a[href*="/status/"]')
+                    tweet_id = (await status_link.get_attribute('href')).split('/status/')[1]
+
+                if not tweet_id or tweet_id in tweets_seen:
+                    continue
+
+                tweets_seen.add(tweet_id)
+                logging.info(f"Processing tweet {tweet_id}")
+
+                tweet_data = await self.extract_tweet_data(tweet)
+                if tweet_data:
+                    tweet_data['is_thread'] = bool(await tweet.query_selector('[data-testid="conversationThread"]'))
+                    tweet_data['media'] = await self._extract_media(tweet)
+                    collected.append(tweet_data)
+            except Exception as e:
+                logging.error(f"Error processing tweet: {str(e)}")
+                continue
+        return collected
+
+    def _collect_network(self, capture: ResponseCapture, tweets_seen: set,
+                         username: Optional[str] = None) -> List[Dict]:
+        """New tweets parsed from captured API responses, no DOM access at all"""
+        collected = []
+        for tweet in capture.drain():
+            author = tweet.get('author')
+            if username and author and author.lower() != username.lower():
+                continue
+            if tweet['id'] in tweets_seen or not tweet['text']:
+                continue
+            tweets_seen.add(tweet['id'])
+            logging.info(f"Processing tweet {tweet['id']}")
+            collected.append(tweet)
+        return collected
+
+    async def _collect_new_tweets(self, page, tweets_seen: set,
+                                  capture: Optional[ResponseCapture] = None,
+                                  username: Optional[str] = None) -> List[Dict]:
+        """Every tweet that appeared since the last call. Nothing is held back for
+        a later call, so callers apply their limit after their own filtering."""
+        if capture is not None:
+            return self._collect_network(capture, tweets_seen, username)
+        if self.extraction_mode == 'dom':
+            return await self._collect_dom(page, tweets_seen)
+        return await self._collect_batch(page, tweets_seen)
+
+    async def _extract_media(self, tweet_element) -> List[Dict]:
+        """Extract media (images, videos) from tweet"""
+        media = []
+        media_container = await tweet_element.query_selector('[data-testid="tweetPhoto"], [data-testid="tweetVideo"]')
+        if media_container:
+            if 'tweetPhoto' in await media_container.get_attribute('data-testid'):
+                images = await media_container.query_selector_all('img')
+                for img in images:
+                    media.append({
+                        'type': 'image',
+                        'url': await img.get_attribute('src')
+                    })
+            else:
+                video = await media_container.query_selector('video')
+                if video:
+                    media.append({
+                        'type': 'video',
+                        'url': await video.get_attribute('src')
+                    })
+        return media
+
+    async def scrape_profiles(self, usernames: List[str], tweet_limit: Optional[int] = 10,
+                              max_concurrency: Optional[int] = None,
+                              batch_id: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """Scrape several profiles concurrently over the browser pool.
+
+        With a checkpoint store and ``batch_id``, profiles finished by an
+        earlier run of the same batch are skipped.
+        """
+        if batch_id and self.checkpoint_store:
+            finished = set(self.checkpoint_store.finished_profiles(batch_id))
+            if finished:
+                logging.info(f"Batch {batch_id}: skipping {len(finished)} finished profiles")
+            usernames = [username for username in usernames if username not in finished]
+
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        owns_pool = self.pool is None
+        await self.start()
+
+        async def run(username: str) -> List[Dict]:
+            async with semaphore:
+                return await self.scrape_profile(username, tweet_limit, batch_id=batch_id)
+
+        try:
+            results = await asyncio.gather(
+                *(run(username) for username in usernames),
+                return_exceptions=True
+            )
+        finally:
+            if owns_pool:
+                await self.close()
+
+        scraped = {}
+        for username, result in zip(usernames, results):
+            if isinstance(result, Exception):
+                logging.error(f"Profile task for @{username} failed: {str(result)}")
+                scraped[username] = []
+            else:
+                scraped[username] = result
+        return scraped
+
+    async def scrape_profile(self, username: str, tweet_limit: Optional[int] = 10,
+                             batch_id: Optional[str] = None) -> List[Dict]:
+        """Scrape one profile into a list, persisting through a write-behind sink"""
+        return [tweet async for tweet in self.iter_profile(username, tweet_limit, batch_id=batch_id)]
+
+    async def iter_profile(self, username: str, tweet_limit: Optional[int] = None,
+                           persist: bool = True, batch_id: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Yield a profile's tweets as soon as each one is complete.
+
+        With ``persist`` the tweets also go to a WriteBehindSink that flushes
+        every ``flush_every`` tweets or ``flush_interval`` seconds and on exit,
+        so nothing here holds more than a batch of tweets in memory. In
+        incremental runs, tweets already stored aren't yielded again; the
+        sink only refreshes their metrics.
+
+        With a checkpoint store, stored tweet IDs and scroll progress are
+        checkpointed as the run goes and an interrupted run resumes past them.
+        """
+        owns_pool = self.pool is None
+        if owns_pool:
+            await self.start()
+
+        checkpoint = None
+        if self.checkpoint_store:
+            checkpoint = await asyncio.to_thread(ProfileCheckpoint, self.checkpoint_store, username)
+
+        sink = None
+        if persist:
+            sink = WriteBehindSink(
+                self.db_manager,
+                username,
+                flush_every=self.flush_every,
+                flush_interval=self.flush_interval,
+                on_flush=checkpoint.record_stored if checkpoint else None
+            )
+        try:
+            async def observe(tweet):
+                await self._enqueue(sink.observe, sink, tweet)
+
+            async for tweet in self._iter_profile(username, tweet_limit, checkpoint, observe if sink else None):
+                if sink:
+                    await self._enqueue(sink.add, sink, tweet)
+                elif checkpoint:
+                    checkpoint.record_stored([tweet])
+                yield tweet
+        finally:
+            if sink:
+                # pymongo is blocking, keep the final flush off the event loop
+                await asyncio.to_thread(sink.close)
+                if sink.summary.get('failed'):
+                    # Surface lost writes so a queue worker fails the job and retries it
+                    self.profile_errors.setdefault(username, f"{sink.summary['failed']} tweets failed to save")
+            if checkpoint:
+                if checkpoint.timeline_done and not (sink and sink.summary.get('failed')):
+                    await asyncio.to_thread(checkpoint.finish, batch_id)
+                else:
+                    await asyncio.to_thread(checkpoint.save)
+            if owns_pool:
+                await self.close()
+
+    @staticmethod
+    async def _enqueue(enqueue: Callable[[Dict], None], sink: WriteBehindSink, tweet: Dict):
+        """Hand a tweet to the sink; when MongoDB is behind and its buffer is full, wait off the event loop"""
+        if sink.has_room():
+            enqueue(tweet)
+        else:
+            await asyncio.to_thread(enqueue, tweet)
+
+    async def _iter_profile(self, username: str, tweet_limit: Optional[int],
+                            checkpoint: Optional[ProfileCheckpoint] = None,
+                            observe: Optional[Callable[[Dict], Awaitable[None]]] = None) -> AsyncIterator[Dict]:
+        limit = tweet_limit if tweet_limit is not None else float('inf')
+        scraped = 0
+        tweets_seen = set()
+        # Tweets waiting on a detail fetch, yielded in timeline order once complete
+        pending = deque()
+        known_ids = set()
+        if self.incremental:
+            known_ids = await asyncio.to_thread(self.db_manager.get_known_tweet_ids, username)
+            logging.info(f"Loaded {len(known_ids)} known tweet IDs for @{username}")
+        known_run = 0
+        resume_ids = set(checkpoint.seen_ids) if checkpoint else set()
+        self.profile_errors.pop(username, None)
+
+        context = await self.pool.acquire()
+        monitor = await TrafficMonitor(self.resource_policy).attach(context)
+        self._monitors[context] = monitor
+        details = None
+        try:
+            page = await context.new_page()
+            capture = ResponseCapture().attach(page) if self.extraction_mode == 'network' else None
+
+            # Go to profile page
+            logging.info(f"Navigating to {self.base_url}/{username}")
+            await self._goto(page, f"{self.base_url}/{username}")
+
+            # Wait for page to load and check its state
+            try:
+                # Wait for any of these elements to appear
+                if not await self.timing.wait_for_selector(page, PAGE_STATE_SELECTOR, name='profile',
+                                                           timeout=self.timing.page_timeout):
+                    logging.error(f"Profile page for @{username} did not load within {self.timing.page_timeout}s")
+                    self.profile_errors[username] = "page did not load: timed out"
+                    return
+
+                # Check for various page states
+                if await page.query_selector('[data-testid="emptyState"]'):
+                    logging.warning(f"Account @{username} appears to be private")
+                    return
+
+                if await page.query_selector('[data-testid="error"]'):
+                    logging.error("Twitter returned an error page")
+                    self.profile_errors[username] = "error page"
+                    return
+
+                # Check if we're on the login page
+                if await page.query_selector('text="Log in to Twitter"'):
+                    logging.error("Twitter is requesting login")
+                    self.proxy_manager.report_failure(self.pool.proxy_key(context), ban=True, reason="login wall")
+                    self.profile_errors[username] = "login wall"
+                    return
+
+                # Check for rate limiting
+                if await page.query_selector('text="Rate limit exceeded"'):
+                    logging.error("Twitter rate limit exceeded")
+                    self.proxy_manager.report_failure(self.pool.proxy_key(context), ban=True, reason="rate limited")
+                    self.profile_errors[username] = "rate limited"
+                    return
+
+                logging.info("Page loaded successfully")
+
+            except Exception as e:
+                logging.error(f"Error waiting for page elements: {str(e)}")
+                self.profile_errors[username] = f"page did not load: {str(e)}"
+                return
+
+            await self.timing.wait_for_selector(page, name='timeline')
+            await self.timing.jitter('timeline')
+
+            # Conversation visits expand their own tweet; the detail workers only
+            # serve truncated previews that get no visit
+            if self.extraction_mode != 'network' and not self.comment_limit:
+                details = await DetailFetchQueue(
+                    context,
+                    self._read_full_text,
+                    workers=self.detail_workers,
+                    maxsize=self.detail_queue_size
+                ).start()
+
+            scroll_attempts = 0
+            max_scroll_attempts = 10
+
+            while scraped < limit and scroll_attempts < max_scroll_attempts:
+                try:
+                    new_tweets = await self._collect_new_tweets(
+                        page, tweets_seen, capture=capture, username=username
+                    )
+
+                    # If we're not getting new tweets after scrolling, increment attempts
+                    if not new_tweets:
+                        scroll_attempts += 1
+                        logging.info(f"No new tweets found after scroll. Attempt {scroll_attempts}/{max_scroll_attempts}")
+                    else:
+                        scroll_attempts = 0
+
+                    for tweet_data in new_tweets:
+                        # The limit counts kept tweets only, skipped ones never use it up
+                        if scraped >= limit:
+                            break
+                        # Stored before an interruption: fast-forward past it
+                        if tweet_data['id'] in resume_ids:
+                            continue
+                        # Already stored: refresh its metrics, skip the conversation visit
+                        # and count towards the stop run
+                        if tweet_data['id'] in known_ids:
+                            known_run += 1
+                            if observe:
+                                tweet_data.pop('truncated', None)
+                                await observe(tweet_data)
+                            continue
+                        known_run = 0
+
+                        tweet_data['thread_tweets'] = []
+                        tweet_data['comments'] = []
+                        try:
+                            tweet_id = tweet_data['id']
+                            # One status page visit covers both the thread and its replies
+                            if tweet_data['is_thread'] or self.comment_limit:
+                                if tweet_data['is_thread']:
+                                    logging.info(f"Tweet {tweet_id} is part of a thread")
+                                thread_tweets, comments = await self.scrape_conversation(
+                                    tweet_id, context,
+                                    author=username,
+                                    include_thread=tweet_data['is_thread'],
+                                    comment_limit=self.comment_limit,
+                                    focal=tweet_data if tweet_data.get('truncated') else None
+                                )
+                                tweet_data['thread_tweets'] = thread_tweets
+                                tweet_data['comments'] = comments
+                        except Exception as e:
+                            logging.error(f"Error processing tweet: {str(e)}")
+
+                        # Expand previews the conversation visit did not cover on the detail workers while we keep scrolling
+                        if tweet_data.pop('truncated', False) and details and tweet_data.get('url'):
+                            await details.submit(tweet_data, tweet_data['url'])
+
+                        pending.append(tweet_data)
+                        scraped += 1
+                        logging.info(f"Successfully scraped tweet {scraped}/{tweet_limit} for @{username}")
+
+                    if details:
+                        logging.info(f"Detail fetch queue depth: {details.depth}")
+
+                    while pending and not (details and details.is_pending(pending[0]['id'])):
+                        yield pending.popleft()
+
+                    if known_ids and known_run >= self.stop_after_known:
+                        logging.info(f"Reached {known_run} already-stored tweets for @{username}, stopping")
+                        break
+
+                    if checkpoint and checkpoint.save_due():
+                        await asyncio.to_thread(checkpoint.save)
+
+                    if scraped < limit:
+                        # Scroll and wait for new content
+                        if await self._scroll_down(page):
+                            logging.info("Successfully scrolled down")
+                        else:
+                            scroll_attempts += 1
+                            logging.info(f"Failed to scroll down. Attempt {scroll_attempts}/{max_scroll_attempts}")
+
+                        # Try to click "Show more tweets" if present
+                        try:
+                            show_more = await page.query_selector('span:has-text("Show more")')
+                            if show_more:
+                                baseline = await self.timing.content_size(page)
+                                await show_more.click()
+                                logging.info("Clicked 'Show more' button")
+                                await self.timing.wait_for_growth(page, baseline, name='show_more')
+                        except Exception as e:
+                            logging.debug(f"No 'Show more' button found: {str(e)}")
+
+                except Exception as e:
+                    logging.error(f"Error during tweet collection: {str(e)}")
+                    scroll_attempts += 1
+
+            if details:
+                # Truncated previews are patched in place once their fetch finishes
+                await details.join()
+            while pending:
+                yield pending.popleft()
+            if checkpoint:
+                checkpoint.timeline_done = True
+
+        except Exception as e:
+            logging.error(f"Error during profile scrape: {str(e)}")
+            self.profile_errors[username] = str(e)
+        finally:
+            if details:
+                await details.close()
+            await monitor.detach()
+            self._monitors.pop(context, None)
+            self.traffic_stats[username] = monitor.get_stats()
+            logging.info(f"Traffic for @{username}: {self.traffic_stats[username]}")
+            await self.pool.release(context)
+
+    async def scrape_conversation(self, tweet_id: str, context, author: Optional[str] = None,
+                                  include_thread: bool = True,
+                                  comment_limit: int = 5,
+                                  focal: Optional[Dict] = None) -> Tuple[List[Dict], List[Dict]]:
+        """Visit a status page once and split its tweets into thread members and replies.
+
+        Tweets by the conversation's author (``author``, or whoever wrote
+        ``tweet_id``) belong to the thread, everything else is a reply. Each
+        tweet is extracted once no matter how many times the page scrolls.
+        ``focal`` is the timeline copy of a truncated ``tweet_id``; its text is
+        expanded from this same page and its ``truncated`` flag cleared.
+        """
+        thread_tweets = []
+        comments = []
+        seen = set()
+        page = await context.new_page()
+        capture = ResponseCapture().attach(page) if self.extraction_mode == 'network' else None
+
+        try:
+            await self._goto(page, f"{self.base_url}/i/web/status/{tweet_id}")
+            await self.timing.wait_for_selector(page, name='conversation')
+            await self.timing.jitter('conversation')
+
+            if author is None:
+                author = await self._status_author(page, tweet_id, capture)
+            author = (author or '').lower()
+
+            saw_reply = False
+            expand_focal = focal is not None and capture is None
+            scroll_attempts = 0
+            max_scroll_attempts = 3
+            while scroll_attempts < max_scroll_attempts:
+                new_tweets = await self._collect_new_tweets(page, seen, capture=capture)
+                for tweet in new_tweets:
+                    if tweet['id'] == tweet_id:
+                        if focal is not None and tweet.get('text') and not tweet.get('truncated'):
+                            focal['text'] = tweet['text']
+                            focal['truncated'] = False
+                        continue
+                    tweet.pop('truncated', None)
+                    tweet.setdefault('media', [])
+                    if author and (tweet.get('author') or '').lower() == author:
+                        if include_thread:
+                            thread_tweets.append(tweet)
+                    else:
+                        saw_reply = True
+                        if len(comments) < comment_limit:
+                            comments.append(tweet)
+
+                # Status pages usually show the focal tweet in full; click its "Show more" before scrolling it away
+                if expand_focal and focal.get('truncated'):
+                    full_content = await self._expand_status_text(page)
+                    if full_content:
+                        focal['text'] = full_content.strip()
+                        focal['truncated'] = False
+                expand_focal = False
+
+                # Replies render below the thread, so the thread is complete once one shows up
+                if len(comments) >= comment_limit and (not include_thread or saw_reply):
+                    break
+
+                if await self._scroll_down(page):
+                    scroll_attempts = 0
+                else:
+                    scroll_attempts += 1
+
+            logging.info(f"Conversation {tweet_id}: {len(thread_tweets)} thread tweets, {len(comments)} replies")
+            return thread_tweets, comments
+
+        finally:
+            await page.close()
+
+    async def _status_author(self, page, tweet_id: str, capture: Optional[ResponseCapture]) -> Optional[str]:
+        """Handle of whoever wrote the focal tweet of a status page"""
+        if capture is not None:
+            for tweet in capture.pending:
+                if tweet['id'] == tweet_id:
+                    return tweet.get('author')
+            return None
+        link = await page.query_selector(f'article a[href*="/status/{tweet_id}"]')
+        if link:
+            href = await link.get_attribute('href')
+            return href.split('/')[1] or None
+        return None
+
+    async def scrape_thread(self, tweet_id: str, context) -> List[Dict]:
+        """Scrape entire thread of tweets"""
+        thread_tweets, _ = await self.scrape_conversation(tweet_id, context, comment_limit=0)
+        return thread_tweets
+
+    async def scrape_comments(self, tweet_id: str, context, limit: int = 5) -> List[Dict]:
+        """Scrape comments/replies to a tweet"""
+        _, comments = await self.scrape_conversation(tweet_id, context, include_thread=False, comment_limit=limit)
+        return comments
+
+    async def _get_metric(self, tweet_element, metric_type: str) -> int:
+        try:
+            # First try to find the group element
+            group = await tweet_element.query_selector(f'[data-testid="{metric_type}"]')
+            if not group:
+                return 0
+
+            # Look for the actual number within the group
+            metric_text = await group.query_selector('[data-testid="app-text-transition-container"]')
+            if not metric_text:
+                return 0
+
+            return parse_metric(await metric_text.inner_text())
+        except Exception as e:
+            logging.error(f"Error getting metric {metric_type}: {str(e)}")
+            return 0
+
+    async def _scroll_down(self, page) -> bool:
+        """Scroll down and wait until new content renders or the timing policy gives up"""
+        try:
+            baseline = await self.timing.content_size(page)
+            await page.evaluate('window.scrollTo(0, document.documentElement.scrollHeight)')
+            grew = await self.timing.wait_for_growth(page, baseline, name='scroll')
+
+            # Try to find the "Show more tweets" button and click it if present
+            show_more = await page.query_selector('span:has-text("Show more tweets")')
+            if show_more:
+                await show_more.click()
+                grew = await self.timing.wait_for_growth(page, baseline, name='scroll.show_more') or grew
+
+            await self.timing.jitter('scroll')
+            return grew
+        except Exception as e:
+            logging.error(f"Error during scroll: {str(e)}")
+            return False
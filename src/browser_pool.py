@@ -0,0 +1,220 @@
+import asyncio
+import random
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set
+from .proxy_manager import proxy_key
+
+
+class PooledBrowser:
+    """A launched browser plus the bookkeeping the pool needs to retire it"""
+
+    def __init__(self, browser, key: str, launch_time: float):
+        self.browser = browser
+        self.key = key
+        self.launch_time = launch_time
+        self.pages_opened = 0
+        self.active_contexts = 0
+        self.heap_mb = 0.0
+        self.retiring = False
+
+
+class BrowserPool:
+    """Keeps browsers alive across profiles and hands out per-proxy contexts"""
+
+    def __init__(self, playwright, proxy_manager, user_agents: List[str],
+                 headless: bool = True, max_pages_per_browser: int = 500,
+                 max_memory_mb: float = 1024.0, max_idle_contexts: int = 2,
+                 viewport: Optional[Dict] = None):
+        self.playwright = playwright
+        self.proxy_manager = proxy_manager
+        self.user_agents = user_agents
+        self.headless = headless
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.max_idle_contexts = max_idle_contexts
+        self.viewport = viewport or {"width": 1920, "height": 1080}
+        self._browsers: Dict[str, PooledBrowser] = {}
+        # Browsers replaced in _browsers while contexts were still leased from them
+        self._retiring: Set[PooledBrowser] = set()
+        self._idle: Dict[str, List] = {}
+        self._context_owner = {}
+        self._lock = asyncio.Lock()
+        self.stats = {
+            'context_hits': 0,
+            'context_misses': 0,
+            'browser_hits': 0,
+            'browser_launches': 0,
+            'browsers_retired': 0,
+            'launch_time_total': 0.0,
+            'launch_time_max': 0.0,
+        }
+
+    @staticmethod
+    def _proxy_key(proxy: Optional[Dict]) -> str:
+        return proxy_key(proxy)
+
+    async def _launch(self, proxy: Optional[Dict], key: str) -> PooledBrowser:
+        started = time.monotonic()
+        browser = await self.playwright.chromium.launch(proxy=proxy, headless=self.headless)
+        elapsed = time.monotonic() - started
+
+        self.stats['browser_launches'] += 1
+        self.stats['launch_time_total'] += elapsed
+        self.stats['launch_time_max'] = max(self.stats['launch_time_max'], elapsed)
+        logging.info(f"Launched browser for {key} in {elapsed:.2f}s")
+        return PooledBrowser(browser, key, elapsed)
+
+    async def _browser_for(self, proxy: Optional[Dict], key: str) -> PooledBrowser:
+        pooled = self._browsers.get(key)
+        if pooled and not pooled.retiring and pooled.browser.is_connected():
+            self.stats['browser_hits'] += 1
+            return pooled
+
+        if pooled:
+            # Closed by _retire_if_drained once its last context comes back, or by close()
+            self._retiring.add(pooled)
+        pooled = await self._launch(proxy, key)
+        self._browsers[key] = pooled
+        return pooled
+
+    async def acquire(self, proxy: Optional[Dict] = None):
+        """Return a context bound to a proxy, reusing an idle one when possible"""
+        if proxy is None:
+            proxy = self.proxy_manager.get_proxy()
+        key = self._proxy_key(proxy)
+
+        async with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                context = idle.pop()
+                pooled = self._context_owner.get(context)
+                if pooled and not pooled.retiring and pooled.browser.is_connected():
+                    pooled.active_contexts += 1
+                    self.stats['context_hits'] += 1
+                    return context
+                await self._discard(context)
+
+            pooled = await self._browser_for(proxy, key)
+            context = await pooled.browser.new_context(
+                viewport=self.viewport,
+                user_agent=random.choice(self.user_agents)
+            )
+            context.on("page", lambda page: self._count_page(pooled))
+            self._context_owner[context] = pooled
+            pooled.active_contexts += 1
+            self.stats['context_misses'] += 1
+            return context
+
+    def proxy_key(self, context) -> str:
+        """Key of the proxy a pooled context goes out through"""
+        pooled = self._context_owner.get(context)
+        return pooled.key if pooled else 'direct'
+
+    def retire(self, key: str):
+        """Stop handing out the browser for ``key`` so the next context gets a fresh connection"""
+        pooled = self._browsers.get(key)
+        if pooled and not pooled.retiring:
+            logging.info(f"Retiring browser for {key} to start a fresh session")
+            pooled.retiring = True
+
+    def _count_page(self, pooled: PooledBrowser):
+        pooled.pages_opened += 1
+        if pooled.pages_opened >= self.max_pages_per_browser and not pooled.retiring:
+            logging.info(f"Retiring browser for {pooled.key} after {pooled.pages_opened} pages")
+            pooled.retiring = True
+
+    async def _sample_memory(self, context, pooled: PooledBrowser):
+        """Record the largest JS heap seen in the context's open pages"""
+        for page in context.pages:
+            try:
+                heap = await page.evaluate(
+                    "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+                )
+                pooled.heap_mb = max(pooled.heap_mb, heap / (1024 * 1024))
+            except Exception:
+                continue
+
+        if pooled.heap_mb >= self.max_memory_mb and not pooled.retiring:
+            logging.info(f"Retiring browser for {pooled.key} at {pooled.heap_mb:.0f} MB heap")
+            pooled.retiring = True
+
+    async def release(self, context, recycle: bool = True):
+        """Give a context back; it is recycled unless its browser is being retired"""
+        async with self._lock:
+            pooled = self._context_owner.get(context)
+            if pooled is None:
+                await context.close()
+                return
+
+            pooled.active_contexts -= 1
+            await self._sample_memory(context, pooled)
+
+            idle = self._idle.setdefault(pooled.key, [])
+            if recycle and not pooled.retiring and len(idle) < self.max_idle_contexts:
+                try:
+                    for page in list(context.pages):
+                        await page.close()
+                    await context.clear_cookies()
+                    idle.append(context)
+                    return
+                except Exception as e:
+                    logging.warning(f"Could not recycle context: {str(e)}")
+
+            await self._discard(context)
+            await self._retire_if_drained(pooled)
+
+    async def _discard(self, context):
+        self._context_owner.pop(context, None)
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    async def _retire_if_drained(self, pooled: PooledBrowser):
+        if not pooled.retiring or pooled.active_contexts > 0:
+            return
+        idle = self._idle.get(pooled.key, [])
+        for context in [c for c in idle if self._context_owner.get(c) is pooled]:
+            idle.remove(context)
+            await self._discard(context)
+        if self._browsers.get(pooled.key) is pooled:
+            del self._browsers[pooled.key]
+        self._retiring.discard(pooled)
+        await pooled.browser.close()
+        self.stats['browsers_retired'] += 1
+
+    @asynccontextmanager
+    async def context(self, proxy: Optional[Dict] = None, recycle: bool = True):
+        context = await self.acquire(proxy)
+        try:
+            yield context
+        finally:
+            await self.release(context, recycle=recycle)
+
+    async def close(self):
+        async with self._lock:
+            for contexts in self._idle.values():
+                for context in contexts:
+                    await self._discard(context)
+            self._idle.clear()
+            for pooled in [*self._browsers.values(), *self._retiring]:
+                try:
+                    await pooled.browser.close()
+                except Exception:
+                    pass
+            self._browsers.clear()
+            self._retiring.clear()
+            self._context_owner.clear()
+
+    def get_stats(self) -> Dict:
+        """Pool hit/miss and launch-time stats"""
+        stats = dict(self.stats)
+        requests = stats['context_hits'] + stats['context_misses']
+        stats['context_hit_rate'] = stats['context_hits'] / requests if requests else 0.0
+        launches = stats['browser_launches']
+        stats['launch_time_avg'] = stats['launch_time_total'] / launches if launches else 0.0
+        stats['live_browsers'] = len(self._browsers)
+        stats['idle_contexts'] = sum(len(contexts) for contexts in self._idle.values())
+        return stats
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class FileCheckpointStore:
+    """Checkpoints as small JSON files on local disk, one per profile and per batch"""
+
+    def __init__(self, directory: str = "checkpoints"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, kind: str, key: str) -> Path:
+        safe_key = "".join(c if c.isalnum() or c in '-_' else '_' for c in key)
+        return self.directory / f"{kind}_{safe_key}.json"
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error(f"Unreadable checkpoint {path}: {str(e)}")
+            return None
+
+    def _write(self, path: Path, state: Dict):
+        # Write then rename so a crash mid-write never leaves a torn checkpoint
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, default=str)
+        os.replace(tmp_path, path)
+
+    def load_profile(self, username: str) -> Optional[Dict]:
+        return self._read(self._path('profile', username))
+
+    def save_profile(self, username: str, state: Dict):
+        self._write(self._path('profile', username), state)
+
+    def clear_profile(self, username: str):
+        self._path('profile', username).unlink(missing_ok=True)
+
+    def finished_profiles(self, batch_id: str) -> List[str]:
+        state = self._read(self._path('batch', batch_id)) or {}
+        return state.get('finished', [])
+
+    def mark_profile_finished(self, batch_id: str, username: str):
+        path = self._path('batch', batch_id)
+        state = self._read(path) or {'batch_id': batch_id, 'finished': []}
+        if username not in state['finished']:
+            state['finished'].append(username)
+        state['updated_at'] = datetime.now().isoformat()
+        self._write(path, state)
+
+
+class MongoCheckpointStore:
+    """Checkpoints in a MongoDB collection so any machine can resume a run"""
+
+    def __init__(self, db_manager, collection: str = 'checkpoints'):
+        self.collection = db_manager.db[collection]
+
+    def load_profile(self, username: str) -> Optional[Dict]:
+        return self.collection.find_one({'_id': f"profile:{username}"}, {'_id': 0})
+
+    def save_profile(self, username: str, state: Dict):
+        self.collection.replace_one({'_id': f"profile:{username}"}, state, upsert=True)
+
+    def clear_profile(self, username: str):
+        self.collection.delete_one({'_id': f"profile:{username}"})
+
+    def finished_profiles(self, batch_id: str) -> List[str]:
+        state = self.collection.find_one({'_id': f"batch:{batch_id}"}) or {}
+        return state.get('finished', [])
+
+    def mark_profile_finished(self, batch_id: str, username: str):
+        self.collection.update_one(
+            {'_id': f"batch:{batch_id}"},
+            {
+                '$addToSet': {'finished': username},
+                '$set': {'updated_at': datetime.now()}
+            },
+            upsert=True
+        )
+
+
+class ProfileCheckpoint:
+    """Progress of one profile scrape: seen tweet IDs and the last stored tweet.
+
+    Tweet IDs are recorded once they are durably stored (after a write-behind
+    flush) so a resumed run never skips a tweet that was only in memory.
+    Recording does no I/O; the scraper saves when ``save_due`` says so, every
+    ``save_every`` stored tweets or ``save_interval`` seconds, off the event loop.
+    """
+
+    def __init__(self, store, username: str, save_every: int = 100, save_interval: float = 30.0):
+        self.store = store
+        self.username = username
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+        self._unsaved = 0
+        self.timeline_done = False
+
+        state = store.load_profile(username) or {}
+        self.seen_ids = set(state.get('seen_ids', []))
+        self.last_tweet_id = state.get('last_tweet_id')
+        self.scraped = state.get('scraped', 0)
+        if self.seen_ids:
+            logging.info(f"Resuming @{username} from checkpoint: {len(self.seen_ids)} tweets already stored")
+
+    def record_stored(self, tweets: List[Dict]):
+        with self._lock:
+            for tweet in tweets:
+                if tweet.get('id'):
+                    self.seen_ids.add(tweet['id'])
+                    self.last_tweet_id = tweet['id']
+            self.scraped += len(tweets)
+            self._unsaved += len(tweets)
+
+    def save_due(self) -> bool:
+        with self._lock:
+            if not self._unsaved:
+                return False
+            return self._unsaved >= self.save_every or time.monotonic() - self._last_save >= self.save_interval
+
+    def save(self):
+        with self._lock:
+            state = {
+                'username': self.username,
+                'seen_ids': sorted(self.seen_ids),
+                'last_tweet_id': self.last_tweet_id,
+                'scraped': self.scraped,
+                'updated_at': datetime.now().isoformat()
+            }
+            self._last_save = time.monotonic()
+            self._unsaved = 0
+        try:
+            self.store.save_profile(self.username, state)
+        except Exception as e:
+            logging.error(f"Could not save checkpoint for @{self.username}: {str(e)}")
+
+    def finish(self, batch_id: Optional[str] = None):
+        """Drop the per-profile state and mark the profile done in its batch"""
+        self.store.clear_profile(self.username)
+        if batch_id:
+            self.store.mark_profile_finished(batch_id, self.username)
@@ -1,10 +1,63 @@
-from pymongo import MongoClient, ASCENDING
-from pymongo.errors import PyMongoError
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, PyMongoError
 import os
+import json
+import hashlib
 import logging
-from datetime import datetime
-from typing import List, Dict
+import sqlite3
+from datetime import datetime, timezone
+from typing import Iterator, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
+from .extraction import snowflake_time
+from .search_index import LocalSearchIndex
+
+def _snowflake(tweet_id: str) -> int:
+    """Tweet IDs are time-ordered snowflakes; compare them numerically, not as strings"""
+    try:
+        return int(tweet_id)
+    except (TypeError, ValueError):
+        return 0
+
+# Engagement counters kept per tweet and summed per profile
+METRICS = ('likes', 'retweets', 'replies')
+
+# Bookkeeping fields that change on every write, left out of the fingerprint
+VOLATILE_FIELDS = ('scraped_at', 'last_seen_at', 'fingerprint')
+
+# Arrays older tweet documents embedded; they now live in the threads, comments and media collections
+EMBEDDED_FIELDS = ('thread_tweets', 'comments', 'media')
+
+def _fingerprint(doc: Dict) -> str:
+    """Hash of a stored tweet's content and metrics, compared to skip unchanged writes"""
+    content = {key: value for key, value in doc.items() if key not in VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def _mongo_datetime(value: datetime) -> datetime:
+    """Naive UTC at millisecond precision, exactly what MongoDB hands back"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+def keyset_filter(timestamp: Optional[datetime], tweet_id: str, descending: bool = False) -> Dict:
+    """Tweets that come after (timestamp, tweet_id) when sorted on (timestamp, tweet_id).
+
+    Tweets without a timestamp sort before every date, as MongoDB orders null,
+    so a page boundary on either side of them doesn't skip any.
+    """
+    op = '$lt' if descending else '$gt'
+    branches = [{'timestamp': timestamp, 'tweet_id': {op: tweet_id}}]
+    if timestamp is None:
+        if not descending:
+            branches.append({'timestamp': {'$ne': None}})
+    else:
+        branches.append({'timestamp': {op: timestamp}})
+        if descending:
+            branches.append({'timestamp': None})
+    return {'$or': branches}
+
+def _utcnow() -> datetime:
+    """Bookkeeping times are stored like tweet timestamps, as naive UTC"""
+    return _mongo_datetime(datetime.now(timezone.utc))
 
 class DatabaseManager:
     def __init__(self):
@@ -19,106 +72,552 @@ class DatabaseManager:
             self.comments = self.db['comments']
             self.media = self.db['media']
             self.quote_tweets = self.db['quote_tweets']
+            self.tweet_metrics = self.setup_metrics_collection()
             self.setup_indexes()
+            # Optional local full-text index kept up to date by save_tweets
+            search_path = os.getenv('SEARCH_INDEX_PATH')
+            self.search_index = LocalSearchIndex(search_path) if search_path else None
             logging.info("Successfully connected to MongoDB")
         except PyMongoError as e:
             logging.error(f"MongoDB Error: {str(e)}")
             raise
 
+    def setup_metrics_collection(self):
+        """Time-series collection of engagement snapshots, bucketed by tweet and author"""
+        try:
+            self.db.create_collection(
+                'tweet_metrics',
+                timeseries={'timeField': 'observed_at', 'metaField': 'tweet', 'granularity': 'hours'}
+            )
+        except CollectionInvalid:
+            pass  # already created
+        return self.db['tweet_metrics']
+
     def setup_indexes(self):
         self.tweets.create_index([('tweet_id', ASCENDING)], unique=True)
-        self.tweets.create_index([('author.username', ASCENDING)])
-        self.tweets.create_index([('timestamp', ASCENDING)])
+        # Per-user timelines and date ranges; tweet_id breaks timestamp ties for keyset pagination
+        self.tweets.create_index([('author.username', ASCENDING), ('timestamp', ASCENDING), ('tweet_id', ASCENDING)])
+        self.tweets.create_index([('timestamp', ASCENDING), ('tweet_id', ASCENDING)])
         self.tweets.create_index([('thread_id', ASCENDING)])
         self.profiles.create_index([('username', ASCENDING)], unique=True)
+        self.threads.create_index([('tweet_id', ASCENDING)], unique=True)
+        self.threads.create_index([('thread_id', ASCENDING), ('position', ASCENDING)])
         self.comments.create_index([('tweet_id', ASCENDING)])
         self.comments.create_index([('parent_id', ASCENDING)])
+        self.tweets.create_index([('content', TEXT)], name='content_text')
+        self.comments.create_index([('content', TEXT)], name='content_text')
         self.media.create_index([('tweet_id', ASCENDING)])
+        self.media.create_index([('tweet_id', ASCENDING), ('url', ASCENDING)], unique=True)
         self.quote_tweets.create_index([('tweet_id', ASCENDING)])
+        self.tweet_metrics.create_index([('tweet.tweet_id', ASCENDING), ('observed_at', ASCENDING)])
+        self.tweet_metrics.create_index([('tweet.username', ASCENDING), ('observed_at', ASCENDING)])
 
-    def save_tweets(self, tweets: List[Dict], username: str) -> None:
-        """Save multiple tweets to the database"""
+    def _tweet_doc(self, tweet: Dict, username: str) -> Dict:
+        tweet_doc = {
+            'tweet_id': tweet['id'],
+            'author': {'username': username},
+            'content': tweet.get('text', ''),
+            'metrics': {
+                'likes': int(tweet.get('likes', 0)),
+                'retweets': int(tweet.get('retweets', 0)),
+                'replies': int(tweet.get('replies', 0))
+            },
+            'is_thread': tweet.get('is_thread', False),
+            'scraped_at': _utcnow()
+        }
+        timestamp = tweet.get('timestamp') or snowflake_time(tweet['id'])
+        if timestamp:
+            tweet_doc['timestamp'] = _mongo_datetime(timestamp)
+        return tweet_doc
+
+    def _bulk_upsert(self, collection, operations: List, batch_size: int) -> Dict:
+        """Run upserts as unordered bulk_write batches and summarise the outcome"""
+        summary = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+
+        for start in range(0, len(operations), batch_size):
+            batch = operations[start:start + batch_size]
+            try:
+                result = collection.bulk_write(batch, ordered=False)
+                inserted = result.upserted_count
+                matched = result.matched_count
+                modified = result.modified_count
+            except BulkWriteError as e:
+                # Unordered batches keep going past bad documents, count what did land
+                details = e.details
+                errors = details.get('writeErrors', [])
+                inserted = details.get('nUpserted', 0)
+                matched = details.get('nMatched', 0)
+                modified = details.get('nModified', 0)
+                summary['failed'] += len(errors)
+                if errors:
+                    logging.error(f"{len(errors)} writes failed in {collection.name} batch, first: {errors[0].get('errmsg')}")
+            except PyMongoError as e:
+                summary['failed'] += len(batch)
+                logging.error(f"Bulk write to {collection.name} failed: {str(e)}")
+                continue
+
+            summary['inserted'] += inserted
+            summary['updated'] += modified
+            summary['unchanged'] += matched - modified
+
+        return summary
+
+    def save_tweets(self, tweets: List[Dict], username: str, batch_size: int = 500) -> Dict:
+        """Save multiple tweets to the database in bulk and return a write summary"""
         if not tweets:
             logging.warning(f"No tweets to save for user {username}")
-            return
-            
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'changed': 0}
+
         logging.info(f"Saving {len(tweets)} tweets for user {username}")
-        
+
+        tweet_docs = {}
+        skipped = 0
         for tweet in tweets:
+            if not tweet.get('id'):
+                skipped += 1
+                continue
+            tweet_docs[tweet['id']] = self._tweet_doc(tweet, username)
+
+        if skipped:
+            logging.warning(f"Skipped {skipped} tweets with no ID")
+
+        # One read of the stored versions drives both change detection and the profile counter deltas
+        stored = self._stored_docs(self.tweets, list(tweet_docs))
+        stats_update = self._profile_stats_update(list(tweet_docs.values()), stored)
+        summary = self._upsert_changed(self.tweets, tweet_docs, batch_size, stored)
+        related_failed = self._save_related(tweets, username, batch_size)
+        self._index_locally(list(tweet_docs.values()), 'tweet')
+        self.record_metrics(list(tweet_docs.values()), batch_size)
+        if summary['failed']:
+            logging.warning(f"Profile stats for {username} not updated after failed writes, run rebuild_profile_stats")
+        elif stats_update:
+            self.profiles.update_one({'username': username}, stats_update, upsert=True)
+
+        summary['failed'] += skipped + related_failed
+        logging.info(f"Finished saving tweets for user {username}: {summary}")
+        return summary
+
+    def record_metrics(self, tweet_docs: List[Dict], batch_size: int = 500) -> int:
+        """Append one engagement snapshot per scraped tweet to the time-series collection"""
+        snapshots = [
+            {
+                'tweet': {'tweet_id': doc['tweet_id'], 'username': doc['author']['username']},
+                'observed_at': doc['scraped_at'],
+                **{metric: doc['metrics'][metric] for metric in METRICS}
+            }
+            for doc in tweet_docs
+        ]
+        recorded = 0
+        for start in range(0, len(snapshots), batch_size):
+            try:
+                recorded += len(self.tweet_metrics.insert_many(snapshots[start:start + batch_size], ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                recorded += e.details.get('nInserted', 0)
+                logging.error(f"{len(e.details.get('writeErrors', []))} metric snapshots failed to write")
+            except PyMongoError as e:
+                logging.error(f"Could not record metric snapshots: {str(e)}")
+        return recorded
+
+    def update_metrics(self, tweets: List[Dict], username: str, batch_size: int = 500) -> Dict:
+        """Re-observe already stored tweets: refresh their metrics, profile counters and snapshots.
+
+        Only ``metrics`` is written, so a re-scrape that skipped the detail
+        fetch can't replace stored full text with a truncated preview.
+        Tweets that aren't stored yet are left for save_tweets.
+        """
+        summary = {'updated': 0, 'unchanged': 0, 'failed': 0}
+        incoming = {tweet['id']: self._tweet_doc(tweet, username) for tweet in tweets if tweet.get('id')}
+        stored = self._stored_docs(self.tweets, list(incoming))
+        observed = [doc for tweet_id, doc in incoming.items() if tweet_id in stored]
+        if not observed:
+            return summary
+
+        now = _utcnow()
+        operations, unchanged = [], []
+        for doc in observed:
+            before = stored[doc['tweet_id']]
+            if before.get('metrics') == doc['metrics']:
+                unchanged.append(doc['tweet_id'])
+                continue
+            operations.append(UpdateOne({'tweet_id': doc['tweet_id']}, {'$set': {
+                'metrics': doc['metrics'],
+                'fingerprint': _fingerprint(dict(before, metrics=doc['metrics'])),
+                'scraped_at': doc['scraped_at'],
+                'last_seen_at': now,
+            }}))
+
+        written = self._bulk_upsert(self.tweets, operations, batch_size)
+        summary['updated'] = written['updated']
+        summary['failed'] = written['failed']
+        summary['unchanged'] = len(unchanged)
+        if unchanged:
+            try:
+                self.tweets.update_many({'tweet_id': {'$in': unchanged}}, {'$set': {'last_seen_at': now}})
+            except PyMongoError as e:
+                logging.error(f"Could not mark re-observed tweets seen: {str(e)}")
+
+        self.record_metrics(observed, batch_size)
+        if summary['failed']:
+            logging.warning(f"Profile stats for {username} not updated after failed writes, run rebuild_profile_stats")
+        else:
+            self.profiles.update_one({'username': username}, self._profile_stats_update(observed, stored), upsert=True)
+        return summary
+
+    def _stored_docs(self, collection, tweet_ids: List[str]) -> Dict[str, Dict]:
+        if not tweet_ids:
+            return {}
+        return {doc['tweet_id']: doc for doc in collection.find({'tweet_id': {'$in': tweet_ids}}, {'_id': 0})}
+
+    def _upsert_changed(self, collection, docs: Dict[str, Dict], batch_size: int,
+                        stored: Optional[Dict[str, Dict]] = None) -> Dict:
+        """Write only new or changed documents, and only their changed fields.
+
+        Unchanged documents just get ``last_seen_at`` bumped in one
+        update_many. ``changed`` in the summary counts inserts plus
+        documents whose content or metrics really differed.
+        """
+        if stored is None:
+            stored = self._stored_docs(collection, list(docs))
+        now = _utcnow()
+        changed_ops, backfill_ops, unchanged = [], [], []
+        for tweet_id, doc in docs.items():
+            doc['fingerprint'] = _fingerprint(doc)
+            before = stored.get(tweet_id)
+            if before is None:
+                changed_ops.append(UpdateOne({'tweet_id': tweet_id}, {'$set': dict(doc, last_seen_at=now)}, upsert=True))
+                continue
+            if before.get('fingerprint') == doc['fingerprint']:
+                unchanged.append(tweet_id)
+                continue
+
+            changes = {key: value for key, value in doc.items()
+                       if key not in VOLATILE_FIELDS and before.get(key) != value}
+            update = {'fingerprint': doc['fingerprint'], 'last_seen_at': now}
+            if changes:
+                update.update(changes, scraped_at=doc['scraped_at'])
+                changed_ops.append(UpdateOne({'tweet_id': tweet_id}, {'$set': update}))
+            else:
+                # Stored before fingerprints existed, content is the same
+                backfill_ops.append(UpdateOne({'tweet_id': tweet_id}, {'$set': update}))
+
+        summary = self._bulk_upsert(collection, changed_ops, batch_size)
+        summary['changed'] = summary['inserted'] + summary['updated']
+        backfilled = self._bulk_upsert(collection, backfill_ops, batch_size)
+        summary['failed'] += backfilled['failed']
+        summary['unchanged'] += len(unchanged) + len(backfill_ops) - backfilled['failed']
+
+        for start in range(0, len(unchanged), batch_size):
             try:
-                tweet_id = tweet.get('id')
-                if not tweet_id:
-                    logging.warning("Skipping tweet with no ID")
-                    continue
-                    
-                tweet_doc = {
-                    'tweet_id': tweet_id,
-                    'author': {'username': username},
-                    'content': tweet.get('text', ''),
-                    'metrics': {
-                        'likes': int(tweet.get('likes', 0)),
-                        'retweets': int(tweet.get('retweets', 0)),
-                        'replies': int(tweet.get('replies', 0))
-                    },
-                    'is_thread': tweet.get('is_thread', False),
-                    'thread_tweets': tweet.get('thread_tweets', []),
-                    'comments': tweet.get('comments', []),
-                    'media': tweet.get('media', []),
-                    'scraped_at': datetime.now()
-                }
-                
-                result = self.tweets.update_one(
-                    {'tweet_id': tweet_id},
-                    {'$set': tweet_doc},
-                    upsert=True
+                collection.update_many(
+                    {'tweet_id': {'$in': unchanged[start:start + batch_size]}},
+                    {'$set': {'last_seen_at': now}}
                 )
-                
-                if result.upserted_id:
-                    logging.info(f"Inserted new tweet {tweet_id}")
-                elif result.modified_count:
-                    logging.info(f"Updated existing tweet {tweet_id}")
-                else:
-                    logging.info(f"Tweet {tweet_id} already exists")
-                    
-            except Exception as e:
-                logging.error(f"Error saving tweet {tweet_id}: {str(e)}")
+            except PyMongoError as e:
+                logging.error(f"Could not mark unchanged documents seen in {collection.name}: {str(e)}")
+        return summary
+
+    def _index_locally(self, docs: List[Dict], kind: str) -> None:
+        if not self.search_index:
+            return
+        try:
+            self.search_index.add_documents(docs, kind)
+        except sqlite3.Error as e:
+            # MongoDB stays the source of truth; LocalSearchIndex.rebuild_from catches the index up
+            logging.error(f"Could not update local search index: {str(e)}")
+
+    def _save_related(self, tweets: List[Dict], username: str, batch_size: int) -> int:
+        """Write threads, comments and media of scraped tweets to their own collections; returns failures"""
+        thread_docs, comment_docs, media_ops = {}, {}, []
+        for tweet in tweets:
+            if not tweet.get('id'):
                 continue
-                
-        logging.info(f"Finished saving tweets for user {username}")
+            media_ops.extend(self._media_ops(tweet['id'], tweet.get('media', [])))
+            members = tweet.get('thread_tweets', [])
+            thread_docs.update(self._thread_docs(members, tweet['id'], username))
+            for member in members:
+                media_ops.extend(self._media_ops(member['id'], member.get('media', [])))
+            for comment in tweet.get('comments', []):
+                comment_docs[comment['id']] = self._comment_doc(comment, tweet['id'])
+
+        failed = 0
+        if thread_docs:
+            failed += self._upsert_changed(self.threads, thread_docs, batch_size)['failed']
+        if comment_docs:
+            failed += self._upsert_changed(self.comments, comment_docs, batch_size)['failed']
+            self._index_locally(list(comment_docs.values()), 'comment')
+        if media_ops:
+            failed += self._bulk_upsert(self.media, media_ops, batch_size)['failed']
+        if not failed:
+            self._drop_embedded([tweet['id'] for tweet in tweets if tweet.get('id')])
+        return failed
+
+    def _drop_embedded(self, tweet_ids: List[str]) -> None:
+        """Remove the arrays tweets embedded before threads, comments and media had their own collections"""
+        try:
+            self.tweets.update_many(
+                {'tweet_id': {'$in': tweet_ids},
+                 '$or': [{field: {'$exists': True}} for field in EMBEDDED_FIELDS]},
+                {'$unset': {field: '' for field in EMBEDDED_FIELDS}}
+            )
+        except PyMongoError as e:
+            logging.error(f"Could not drop embedded related arrays: {str(e)}")
 
-    def get_tweets_by_username(self, username: str, limit: int = 100):
-        """Retrieve tweets for a specific username"""
-        return list(self.tweets.find(
+    def _thread_docs(self, members: List[Dict], root_tweet_id: str, username: Optional[str]) -> Dict[str, Dict]:
+        """Thread members keyed by ID. thread_id is the root tweet, which stays in tweets; members count from 1"""
+        docs = {}
+        for position, member in enumerate(members, 1):
+            thread_doc = self._tweet_doc(member, username or member.get('author'))
+            thread_doc.update(thread_id=root_tweet_id, position=position)
+            docs[member['id']] = thread_doc
+        return docs
+
+    def _comment_doc(self, comment: Dict, parent_tweet_id: str) -> Dict:
+        comment_doc = self._tweet_doc(comment, comment.get('author'))
+        comment_doc['parent_id'] = parent_tweet_id
+        return comment_doc
+
+    @staticmethod
+    def _media_ops(tweet_id: str, media: List[Dict]) -> List[UpdateOne]:
+        return [
+            UpdateOne(
+                {'tweet_id': tweet_id, 'url': item['url']},
+                {'$set': {'type': item.get('type'), 'position': position}},
+                upsert=True
+            )
+            for position, item in enumerate(media) if item.get('url')
+        ]
+
+    def _profile_stats_update(self, tweet_docs: List[Dict], stored: Dict[str, Dict]) -> Optional[Dict]:
+        """$inc deltas for a profile's counters from the stored vs incoming metrics of a batch"""
+        if not tweet_docs:
+            return None
+
+        inc = {'stats.tweet_count': 0}
+        inc.update({f'stats.{metric}': 0 for metric in METRICS})
+        for doc in tweet_docs:
+            before = stored.get(doc['tweet_id'], {}).get('metrics')
+            if before is None:
+                inc['stats.tweet_count'] += 1
+                before = {}
+            for metric in METRICS:
+                inc[f'stats.{metric}'] += doc['metrics'][metric] - int(before.get(metric, 0))
+
+        now = _utcnow()
+        update = {
+            '$inc': inc,
+            '$set': {'last_scraped_at': now},
+            '$setOnInsert': {'first_seen_at': now}
+        }
+        timestamps = [doc['timestamp'] for doc in tweet_docs if doc.get('timestamp')]
+        if timestamps:
+            update['$min'] = {'stats.first_tweet_at': min(timestamps)}
+            update['$max'] = {'stats.last_tweet_at': max(timestamps)}
+        return update
+
+    def get_profile_stats(self, username: str) -> Optional[Dict]:
+        """A profile's maintained counters, without touching the tweets collection"""
+        profile = self.profiles.find_one(
+            {'username': username},
+            {'_id': 0, 'username': 1, 'stats': 1, 'first_seen_at': 1, 'last_scraped_at': 1}
+        )
+        if not profile or not profile.get('stats'):
+            return None
+        return profile
+
+    def rebuild_profile_stats(self, usernames: Optional[List[str]] = None) -> None:
+        """Recompute profile counters from the tweets collection, server-side via $merge"""
+        match = {'author.username': {'$in': list(usernames)}} if usernames else {}
+        self.tweets.aggregate([
+            {'$match': match},
+            {'$group': {
+                '_id': '$author.username',
+                'tweet_count': {'$sum': 1},
+                'likes': {'$sum': '$metrics.likes'},
+                'retweets': {'$sum': '$metrics.retweets'},
+                'replies': {'$sum': '$metrics.replies'},
+                'first_tweet_at': {'$min': '$timestamp'},
+                'last_tweet_at': {'$max': '$timestamp'},
+            }},
+            {'$project': {
+                '_id': 0,
+                'username': '$_id',
+                'stats': {
+                    'tweet_count': '$tweet_count',
+                    'likes': '$likes',
+                    'retweets': '$retweets',
+                    'replies': '$replies',
+                    'first_tweet_at': '$first_tweet_at',
+                    'last_tweet_at': '$last_tweet_at',
+                },
+                'stats_rebuilt_at': '$$NOW',
+            }},
+            {'$merge': {'into': self.profiles.name, 'on': 'username',
+                        'whenMatched': 'merge', 'whenNotMatched': 'insert'}},
+        ])
+        logging.info(f"Rebuilt profile stats for {', '.join(usernames) if usernames else 'all profiles'}")
+
+    def get_tweets_by_username(self, username: str, limit: int = 100, with_related: bool = False):
+        """Retrieve tweets for a specific username, optionally with their threads, comments and media"""
+        tweets = list(self.tweets.find(
             {'author.username': username},
             {'_id': 0}  # Exclude MongoDB's _id field
         ).limit(limit))
+        if with_related:
+            self.attach_related(tweets, thread=True, comments=True, media=True)
+        return tweets
     
-    def get_tweets_by_date_range(self, start_date, end_date):
-        """Retrieve tweets within a date range"""
-        return list(self.tweets.find(
+    def get_tweets_by_date_range(self, start_date, end_date, username: Optional[str] = None,
+                                 limit: int = 0, after: Optional[Tuple[datetime, str]] = None) -> List[Dict]:
+        """Retrieve tweets within a date range, oldest first.
+
+        ``after`` is the ``(timestamp, tweet_id)`` of the last tweet of the previous
+        page; together with ``limit`` it pages through the range as index scans.
+        """
+        query = {'timestamp': {'$gte': start_date, '$lte': end_date}}
+        if username:
+            query['author.username'] = username
+        if after:
+            query = {'$and': [query, keyset_filter(*after)]}
+        cursor = self.tweets.find(query, {'_id': 0}).sort([('timestamp', ASCENDING), ('tweet_id', ASCENDING)])
+        return list(cursor.limit(limit))
+
+    def iter_tweets_by_date_range(self, start_date, end_date, username: Optional[str] = None,
+                                  page_size: int = 500) -> Iterator[Dict]:
+        """Stream a date range page by page instead of holding it all in memory"""
+        after = None
+        while True:
+            page = self.get_tweets_by_date_range(start_date, end_date, username, page_size, after)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = (page[-1]['timestamp'], page[-1]['tweet_id'])
+
+    def search_tweets(self, query: str, username: Optional[str] = None, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None, page: int = 1, page_size: int = 20,
+                      comments: bool = False) -> List[Dict]:
+        """Relevance-ranked $text search over tweet content (or comment text with ``comments``)"""
+        collection = self.comments if comments else self.tweets
+        match = {'$text': {'$search': query}}
+        if username:
+            match['author.username'] = username
+        if since or until:
+            match['timestamp'] = {}
+            if since:
+                match['timestamp']['$gte'] = since
+            if until:
+                match['timestamp']['$lt'] = until
+
+        score = {'$meta': 'textScore'}
+        projection = {'_id': 0, 'tweet_id': 1, 'author': 1, 'content': 1, 'timestamp': 1,
+                      'metrics': 1, 'parent_id': 1, 'score': score}
+        cursor = collection.find(match, projection).sort([('score', score), ('tweet_id', ASCENDING)])
+        return list(cursor.skip((page - 1) * page_size).limit(page_size))
+
+    def backfill_timestamps(self, batch_size: int = 1000) -> Dict[str, int]:
+        """Set missing timestamps from snowflake tweet IDs in tweets, threads and comments"""
+        filled = {}
+        for collection in (self.tweets, self.threads, self.comments):
+            operations = []
+            filled[collection.name] = 0
+            cursor = collection.find({'timestamp': None}, {'_id': 1, 'tweet_id': 1}).batch_size(batch_size)
+            for doc in cursor:
+                timestamp = snowflake_time(doc.get('tweet_id'))
+                if timestamp:
+                    operations.append(UpdateOne({'_id': doc['_id']}, {'$set': {'timestamp': _mongo_datetime(timestamp)}}))
+                if len(operations) >= batch_size:
+                    filled[collection.name] += self._bulk_upsert(collection, operations, batch_size)['updated']
+                    operations = []
+            if operations:
+                filled[collection.name] += self._bulk_upsert(collection, operations, batch_size)['updated']
+        logging.info(f"Backfilled timestamps from tweet IDs: {filled}")
+        return filled
+
+    def get_known_tweet_ids(self, username: str, limit: int = 200) -> set:
+        """Newest stored tweet IDs for a profile, from its high-water mark or the tweets index"""
+        profile = self.profiles.find_one({'username': username}, {'recent_tweet_ids': 1})
+        if profile and profile.get('recent_tweet_ids'):
+            return set(profile['recent_tweet_ids'])
+
+        # Walks the (author.username, timestamp, tweet_id) index backwards and stops after limit entries
+        cursor = self.tweets.find(
+            {'author.username': username},
+            {'tweet_id': 1, '_id': 0}
+        ).sort([('timestamp', DESCENDING), ('tweet_id', DESCENDING)]).limit(limit)
+        return {doc['tweet_id'] for doc in cursor}
+
+    def update_high_water_mark(self, username: str, tweet_ids: List[str], keep: int = 200) -> None:
+        """Record the newest tweets saved for a profile so the next run can stop early"""
+        tweet_ids = [tweet_id for tweet_id in tweet_ids if tweet_id]
+        if not tweet_ids:
+            return
+
+        profile = self.profiles.find_one({'username': username}, {'recent_tweet_ids': 1}) or {}
+        recent = set(profile.get('recent_tweet_ids', [])) | set(tweet_ids)
+        recent = sorted(recent, key=_snowflake, reverse=True)[:keep]
+
+        self.profiles.update_one(
+            {'username': username},
             {
-                'timestamp': {
-                    '$gte': start_date,
-                    '$lte': end_date
-                }
+                '$set': {
+                    'recent_tweet_ids': recent,
+                    'last_tweet_id': recent[0],
+                    'last_scraped_at': _utcnow()
+                },
+                '$max': {'high_water_mark': _snowflake(recent[0])}
             },
-            {'_id': 0}
-        ))
-
-    def save_thread(self, thread_tweets: List[Dict]) -> None:
-        """Save thread of tweets with proper relationships"""
-        thread_id = thread_tweets[0]['id']
-        
-        for tweet in thread_tweets:
-            tweet['thread_id'] = thread_id
-            self.save_tweet(tweet)
-
-    def save_comments(self, comments: List[Dict], parent_tweet_id: str) -> None:
+            upsert=True
+        )
+
+    def save_thread(self, thread_tweets: List[Dict], root_tweet_id: str, username: Optional[str] = None,
+                    batch_size: int = 500) -> Dict:
+        """Save the tweets following a thread's root (as scrape_thread returns them), like save_tweets does"""
+        if not thread_tweets:
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+        docs = self._thread_docs(thread_tweets, root_tweet_id, username)
+        return self._upsert_changed(self.threads, docs, batch_size)
+
+    def save_comments(self, comments: List[Dict], parent_tweet_id: str, batch_size: int = 500) -> Dict:
         """Save comments/replies with reference to parent tweet"""
-        for comment in comments:
-            comment['parent_id'] = parent_tweet_id
-            self.comments.update_one(
-                {'id': comment['id']},
-                {'$set': comment},
-                upsert=True
-            ) 
\ No newline at end of file
+        docs = {comment['id']: self._comment_doc(comment, parent_tweet_id) for comment in comments}
+        return self._upsert_changed(self.comments, docs, batch_size)
+
+    def get_thread(self, thread_id: str) -> List[Dict]:
+        """Members of a thread in order"""
+        return list(self.threads.find({'thread_id': thread_id}, {'_id': 0}).sort('position', ASCENDING))
+
+    def get_comments(self, parent_tweet_id: str, limit: int = 100) -> List[Dict]:
+        return list(self.comments.find({'parent_id': parent_tweet_id}, {'_id': 0}).limit(limit))
+
+    def get_media(self, tweet_id: str) -> List[Dict]:
+        return list(self.media.find({'tweet_id': tweet_id}, {'_id': 0}).sort('position', ASCENDING))
+
+    def attach_related(self, tweets: List[Dict], thread: bool = False, comments: bool = False,
+                       media: bool = False, comment_limit: int = 100) -> List[Dict]:
+        """Re-join threads, comments and/or media onto stored tweets, one $in query per collection"""
+        ids = [tweet['tweet_id'] for tweet in tweets]
+        if not ids:
+            return tweets
+
+        def grouped(collection, key, sort_field=None):
+            cursor = collection.find({key: {'$in': ids}}, {'_id': 0})
+            if sort_field:
+                cursor = cursor.sort(sort_field, ASCENDING)
+            groups = {}
+            for doc in cursor:
+                groups.setdefault(doc[key], []).append(doc)
+            return groups
+
+        if thread:
+            threads = grouped(self.threads, 'thread_id', 'position')
+        if comments:
+            replies = grouped(self.comments, 'parent_id')
+        if media:
+            media_items = grouped(self.media, 'tweet_id', 'position')
+        for tweet in tweets:
+            if thread:
+                tweet['thread_tweets'] = threads.get(tweet['tweet_id'], [])
+            if comments:
+                tweet['comments'] = replies.get(tweet['tweet_id'], [])[:comment_limit]
+            if media:
+                tweet['media'] = media_items.get(tweet['tweet_id'], [])
+        return tweets
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class DetailFetchQueue:
+    """Bounded queue of tweet detail fetches served by a few reusable pages"""
+
+    def __init__(self, context, fetch: Callable[..., Awaitable[Optional[str]]],
+                 workers: int = 2, maxsize: int = 20):
+        self.context = context
+        self.fetch = fetch
+        self.worker_count = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._workers: List[asyncio.Task] = []
+        self._pages = []
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'max_depth': 0,
+        }
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    async def start(self):
+        for i in range(self.worker_count):
+            page = await self.context.new_page()
+            self._pages.append(page)
+            self._workers.append(asyncio.create_task(self._worker(page, i)))
+        return self
+
+    async def submit(self, tweet: Dict, tweet_url: str) -> asyncio.Future:
+        """Queue a full-text fetch; waits while the queue is full"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[tweet['id']] = future
+        await self.queue.put((tweet, tweet_url, future))
+        self.stats['submitted'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], self.depth)
+        return future
+
+    async def _worker(self, page, index: int):
+        while True:
+            tweet, tweet_url, future = await self.queue.get()
+            try:
+                full_content = await self.fetch(page, tweet_url)
+                if full_content:
+                    tweet['text'] = full_content.strip()
+                    self.stats['completed'] += 1
+                else:
+                    self.stats['failed'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.error(f"Detail worker {index} failed on {tweet_url}: {str(e)}")
+            finally:
+                if not future.done():
+                    future.set_result(tweet)
+                self._pending.pop(tweet['id'], None)
+                self.queue.task_done()
+
+    def is_pending(self, tweet_id: str) -> bool:
+        """Whether a submitted tweet is still waiting for its full text"""
+        return tweet_id in self._pending
+
+    async def join(self):
+        """Wait until every queued fetch has been applied to its tweet"""
+        await self.queue.join()
+
+    async def close(self):
+        await self.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for page in self._pages:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self._workers = []
+        self._pages = []
+        logging.info(f"Detail queue stats: {self.get_stats()}")
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['depth'] = self.depth
+        return stats
@@ -0,0 +1,244 @@
+import csv
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from pymongo import ASCENDING
+from .db_manager import DatabaseManager, keyset_filter
+
+FORMATS = ('jsonl', 'csv', 'parquet')
+COMPRESSIONS = (None, 'gzip', 'zstd')
+
+# Flat columns per output dataset; threads, comments and media go to sibling datasets
+COLUMNS = {
+    'tweets': [
+        ('tweet_id', 'string'), ('username', 'string'), ('content', 'string'),
+        ('likes', 'int'), ('retweets', 'int'), ('replies', 'int'), ('is_thread', 'bool'),
+        ('timestamp', 'timestamp'), ('scraped_at', 'timestamp'), ('last_seen_at', 'timestamp'),
+    ],
+    'threads': [
+        ('thread_id', 'string'), ('position', 'int'), ('tweet_id', 'string'), ('username', 'string'),
+        ('content', 'string'), ('likes', 'int'), ('retweets', 'int'), ('replies', 'int'),
+        ('timestamp', 'timestamp'),
+    ],
+    'comments': [
+        ('parent_id', 'string'), ('tweet_id', 'string'), ('username', 'string'), ('content', 'string'),
+        ('likes', 'int'), ('retweets', 'int'), ('replies', 'int'), ('timestamp', 'timestamp'),
+    ],
+    'media': [
+        ('tweet_id', 'string'), ('position', 'int'), ('type', 'string'), ('url', 'string'),
+    ],
+}
+
+
+def flatten(doc: Dict, dataset: str) -> Dict:
+    """One stored document as a flat row with exactly the dataset's columns"""
+    metrics = doc.get('metrics') or {}
+    author = doc.get('author') or {}
+    values = dict(doc, username=author.get('username'), **metrics)
+    return {name: values.get(name) for name, _ in COLUMNS[dataset]}
+
+
+def _text_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class ChunkWriter:
+    """Writes one chunk of rows to a part file in the chosen format and compression"""
+
+    def __init__(self, fmt: str = 'jsonl', compression: Optional[str] = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}, got {fmt!r}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}, got {compression!r}")
+        self.format = fmt
+        self.compression = compression
+        if compression == 'zstd' and fmt != 'parquet':
+            import zstandard  # noqa: F401 - fail before the export starts, not on the first chunk
+        if fmt == 'parquet':
+            import pyarrow  # noqa: F401
+
+    @property
+    def suffix(self) -> str:
+        if self.format == 'parquet':
+            return '.parquet'  # compressed inside the file, per column chunk
+        return f".{self.format}" + {None: '', 'gzip': '.gz', 'zstd': '.zst'}[self.compression]
+
+    def _open_text(self, path: Path):
+        if self.compression == 'gzip':
+            return gzip.open(path, 'wt', encoding='utf-8', newline='')
+        if self.compression == 'zstd':
+            import zstandard
+            return zstandard.open(path, 'wt', encoding='utf-8', newline='')
+        return open(path, 'w', encoding='utf-8', newline='')
+
+    def write(self, path: Path, dataset: str, rows: List[Dict]):
+        """Write rows to a temporary file and move it into place, so a part is either whole or absent"""
+        tmp_path = path.with_name(path.name + '.tmp')
+        if self.format == 'parquet':
+            self._write_parquet(tmp_path, dataset, rows)
+        else:
+            with self._open_text(tmp_path) as f:
+                if self.format == 'jsonl':
+                    for row in rows:
+                        f.write(json.dumps({key: _text_value(value) for key, value in row.items()}, ensure_ascii=False) + '\n')
+                else:
+                    writer = csv.DictWriter(f, fieldnames=[name for name, _ in COLUMNS[dataset]])
+                    writer.writeheader()
+                    for row in rows:
+                        writer.writerow({key: _text_value(value) for key, value in row.items()})
+        os.replace(tmp_path, path)
+
+    def _write_parquet(self, path: Path, dataset: str, rows: List[Dict]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {'string': pa.string(), 'int': pa.int64(), 'bool': pa.bool_(), 'timestamp': pa.timestamp('ms')}
+        schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS[dataset]])
+        table = pa.Table.from_pylist(rows, schema=schema)
+        pq.write_table(table, path, compression=self.compression or 'none')
+
+
+class TweetExporter:
+    """Streams tweets and their threads, comments and media out of MongoDB in fixed-size chunks.
+
+    Each chunk becomes one part file per dataset next to a manifest that records
+    the last exported tweet's timestamp and tweet_id, so an interrupted export picks up where it stopped
+    and memory stays bounded by chunk_size whatever the export's total size.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, output_dir: str = "exports",
+                 fmt: str = 'jsonl', compression: Optional[str] = None, chunk_size: int = 5000):
+        self.db = db_manager or DatabaseManager()
+        self.output_dir = Path(output_dir)
+        self.writer = ChunkWriter(fmt, compression)
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def export_name(username: Optional[str] = None, since: Optional[datetime] = None,
+                    until: Optional[datetime] = None) -> str:
+        parts = ['tweets', username or 'all']
+        if since:
+            parts.append(f"from{since:%Y%m%d}")
+        if until:
+            parts.append(f"to{until:%Y%m%d}")
+        return '_'.join(parts)
+
+    @staticmethod
+    def _query(username: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> Dict:
+        query = {}
+        if username:
+            query['author.username'] = username
+        if since or until:
+            query['timestamp'] = {}
+            if since:
+                query['timestamp']['$gte'] = since
+            if until:
+                query['timestamp']['$lt'] = until
+        return query
+
+    def _load_manifest(self, path: Path, settings: Dict, resume: bool) -> Dict:
+        if not path.exists():
+            return dict(settings, last_timestamp=None, last_tweet_id=None, parts=0,
+                        rows={name: 0 for name in COLUMNS}, complete=False)
+        if not resume:
+            raise FileExistsError(f"{path.parent} already holds an export; resume it or pick another name")
+
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+        mismatched = [key for key, value in settings.items() if manifest.get(key) != value]
+        if mismatched:
+            raise ValueError(f"Cannot resume {path.parent}: it was exported with different {', '.join(mismatched)}")
+        return manifest
+
+    @staticmethod
+    def _save_manifest(path: Path, manifest: Dict):
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _resume_key(manifest: Dict) -> Optional[Dict]:
+        """(timestamp, tweet_id) of the last exported tweet, where the next chunk starts"""
+        if not manifest['last_tweet_id']:
+            return None
+        if 'last_timestamp' not in manifest:
+            raise ValueError("This export was chunked in tweet_id order by an older version; restart it under a new name")
+        timestamp = manifest['last_timestamp']
+        return {'timestamp': datetime.fromisoformat(timestamp) if timestamp else None,
+                'tweet_id': manifest['last_tweet_id']}
+
+    def _related_rows(self, tweet_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Threads, comments and media of one chunk, flattened, one $in query per collection"""
+        in_chunk = {'$in': tweet_ids}
+        return {
+            'threads': [flatten(doc, 'threads') for doc in
+                        self.db.threads.find({'thread_id': in_chunk}, {'_id': 0})
+                        .sort([('thread_id', ASCENDING), ('position', ASCENDING)])],
+            'comments': [flatten(doc, 'comments') for doc in
+                         self.db.comments.find({'parent_id': in_chunk}, {'_id': 0})],
+            'media': [flatten(doc, 'media') for doc in
+                      self.db.media.find({'tweet_id': in_chunk}, {'_id': 0})
+                      .sort([('tweet_id', ASCENDING), ('position', ASCENDING)])],
+        }
+
+    def export(self, username: Optional[str] = None, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, name: Optional[str] = None, resume: bool = True) -> Dict:
+        """Export matching tweets into output_dir/<name>/<dataset>/part-NNNNN files; returns the manifest"""
+        export_dir = self.output_dir / (name or self.export_name(username, since, until))
+        manifest_path = export_dir / "manifest.json"
+        settings = {
+            'format': self.writer.format,
+            'compression': self.writer.compression,
+            'username': username,
+            'since': since.isoformat() if since else None,
+            'until': until.isoformat() if until else None,
+        }
+        manifest = self._load_manifest(manifest_path, settings, resume)
+        if manifest['complete']:
+            logging.info(f"Export {export_dir} is already complete")
+            return manifest
+
+        for dataset in COLUMNS:
+            (export_dir / dataset).mkdir(parents=True, exist_ok=True)
+        if manifest['last_tweet_id']:
+            logging.info(f"Resuming export {export_dir} after tweet {manifest['last_tweet_id']} (part {manifest['parts']})")
+
+        query = self._query(username, since, until)
+        projection = {'_id': 0, 'fingerprint': 0}
+        last = self._resume_key(manifest)
+        while True:
+            # Keyset pagination on (timestamp, tweet_id), the order of the tweets indexes with or
+            # without author.username in front: each chunk is its own bounded index scan, no in-memory sort
+            chunk_query = query
+            if last:
+                chunk_query = {'$and': [query, keyset_filter(last.get('timestamp'), last['tweet_id'])]}
+            docs = list(self.db.tweets.find(chunk_query, projection)
+                        .sort([('timestamp', ASCENDING), ('tweet_id', ASCENDING)]).limit(self.chunk_size))
+            if not docs:
+                break
+
+            part = f"part-{manifest['parts']:05d}{self.writer.suffix}"
+            tweet_ids = [doc['tweet_id'] for doc in docs]
+            datasets = {'tweets': [flatten(doc, 'tweets') for doc in docs], **self._related_rows(tweet_ids)}
+            for dataset, rows in datasets.items():
+                if rows:
+                    self.writer.write(export_dir / dataset / part, dataset, rows)
+                manifest['rows'][dataset] += len(rows)
+
+            manifest['parts'] += 1
+            last = docs[-1]
+            manifest['last_tweet_id'] = last['tweet_id']
+            manifest['last_timestamp'] = last['timestamp'].isoformat() if last.get('timestamp') else None
+            self._save_manifest(manifest_path, manifest)
+            logging.info(f"Exported part {manifest['parts']} of {export_dir.name}: {manifest['rows']}")
+            if len(docs) < self.chunk_size:
+                break
+
+        manifest['complete'] = True
+        manifest['finished_at'] = datetime.now().isoformat()
+        self._save_manifest(manifest_path, manifest)
+        logging.info(f"Finished export {export_dir}: {manifest['rows']}")
+        return manifest
@@ -0,0 +1,160 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Walks the tweet text node tree so line breaks and block elements survive
+TWEET_TEXT_JS = '''(element) => {
+    const walk = document.createTreeWalker(
+        element,
+        NodeFilter.SHOW_TEXT | NodeFilter.SHOW_ELEMENT,
+        null,
+        false
+    );
+
+    let text = '';
+    let node;
+
+    while (node = walk.nextNode()) {
+        if (node.nodeType === Node.TEXT_NODE) {
+            text += node.textContent;
+        } else if (node.tagName === 'BR') {
+            text += '\\n';
+        } else if (node.nodeType === Node.ELEMENT_NODE) {
+            const style = window.getComputedStyle(node);
+            if (style.display === 'block') {
+                text += '\\n';
+            }
+            if (node.textContent) {
+                text += node.textContent;
+            }
+        }
+    }
+
+    return text;
+}'''
+
+# Reads every not-yet-seen tweet article in a single roundtrip. Articles are
+# tagged with the ID they showed when read; Twitter recycles nodes while
+# virtualising the timeline, so a node showing a different tweet is read again
+# and callers still dedupe on the returned IDs.
+BATCH_EXTRACT_JS = '''() => {
+    const textOf = ''' + TWEET_TEXT_JS + ''';
+
+    const metricText = (article, name) => {
+        const group = article.querySelector(`[data-testid="${name}"]`);
+        if (!group) return '';
+        const node = group.querySelector('[data-testid="app-text-transition-container"]');
+        return node ? node.innerText.trim() : '';
+    };
+
+    const mediaOf = (article) => {
+        const media = [];
+        const container = article.querySelector('[data-testid="tweetPhoto"], [data-testid="tweetVideo"]');
+        if (!container) return media;
+        if (container.getAttribute('data-testid').includes('tweetPhoto')) {
+            for (const img of container.querySelectorAll('img')) {
+                media.push({type: 'image', url: img.getAttribute('src')});
+            }
+        } else {
+            const video = container.querySelector('video');
+            if (video) media.push({type: 'video', url: video.getAttribute('src')});
+        }
+        return media;
+    };
+
+    const entries = [];
+    for (const article of document.querySelectorAll('article[data-testid="tweet"], div[data-testid="tweet"]')) {
+        const link = article.querySelector('a[href*="/status/"]');
+        const url = link ? link.getAttribute('href') : null;
+        const id = url
+            ? url.split('/status/')[1].split(/[/?#]/)[0]
+            : (article.getAttribute('data-tweet-id') || article.getAttribute('data-item-id'));
+        if (!id || article.dataset.xscrapeSeen === id) continue;
+        article.dataset.xscrapeSeen = id;
+
+        const textNode = article.querySelector('[data-testid="tweetText"]');
+        // The permalink wraps the tweet's own <time>; quoted tweets carry theirs further down
+        const time = (link && link.querySelector('time[datetime]')) || article.querySelector('time[datetime]');
+        entries.push({
+            id: id,
+            url: url,
+            author: url ? url.split('/')[1] : null,
+            text: textNode ? textOf(textNode) : null,
+            time: time ? time.getAttribute('datetime') : null,
+            metrics: {
+                like: metricText(article, 'like'),
+                retweet: metricText(article, 'retweet'),
+                reply: metricText(article, 'reply')
+            },
+            media: mediaOf(article),
+            is_thread: !!article.querySelector('[data-testid="conversationThread"]'),
+            truncated: !!article.querySelector('[data-testid="tweet-text-show-more-link"]')
+        });
+    }
+    return entries;
+}'''
+
+
+def parse_metric(text: Optional[str]) -> int:
+    """Turn a rendered metric such as '1,204', '3.4K' or '2M' into an int"""
+    if not text:
+        return 0
+    text = text.strip().replace(',', '')
+    try:
+        if text.endswith('K'):
+            return int(float(text[:-1]) * 1000)
+        if text.endswith('M'):
+            return int(float(text[:-1]) * 1000000)
+        return int(text) if text.isdigit() else 0
+    except ValueError:
+        logging.debug(f"Unparseable metric text: {text}")
+        return 0
+
+
+# Twitter's snowflake epoch (2010-11-04) in milliseconds
+SNOWFLAKE_EPOCH_MS = 1288834974657
+
+
+def parse_datetime_attr(value: Optional[str]) -> Optional[datetime]:
+    """Parse a <time datetime="2024-05-14T12:00:00.000Z"> attribute into an aware UTC datetime"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc)
+    except ValueError:
+        logging.debug(f"Unparseable datetime attribute: {value}")
+        return None
+
+
+def snowflake_time(tweet_id) -> Optional[datetime]:
+    """Creation time encoded in a snowflake tweet ID; None for pre-2010 sequential IDs"""
+    try:
+        offset_ms = int(tweet_id) >> 22
+    except (TypeError, ValueError):
+        return None
+    # Sequential IDs decode to a few seconds past the epoch, real snowflakes never do
+    if offset_ms < 60 * 1000:
+        return None
+    return datetime.fromtimestamp((offset_ms + SNOWFLAKE_EPOCH_MS) / 1000, tz=timezone.utc)
+
+
+def tweet_from_entry(entry: Dict) -> Optional[Dict]:
+    """Build the tweet dict save_tweets expects from one BATCH_EXTRACT_JS entry"""
+    text = entry.get('text')
+    if not text:
+        return None
+
+    metrics = entry.get('metrics') or {}
+    return {
+        'id': entry['id'],
+        'url': entry.get('url'),
+        'author': entry.get('author'),
+        'text': text.strip(),
+        'truncated': bool(entry.get('truncated')),
+        'likes': parse_metric(metrics.get('like')),
+        'retweets': parse_metric(metrics.get('retweet')),
+        'replies': parse_metric(metrics.get('reply')),
+        'is_thread': bool(entry.get('is_thread')),
+        'media': entry.get('media') or [],
+        'timestamp': parse_datetime_attr(entry.get('time')) or snowflake_time(entry['id'])
+    }
@@ -0,0 +1,425 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# queued -> leased -> done, or back to queued with a backoff, or dead after max_attempts
+ACTIVE_STATUSES = ('queued', 'leased')
+
+
+def retry_delay(attempts: int, base: float, cap: float) -> float:
+    """Exponential backoff before a failed job is offered again"""
+    return min(base * 2 ** max(attempts - 1, 0), cap)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class MongoJobQueue:
+    """Profile jobs in a MongoDB collection, leased atomically so any number of workers can share it"""
+
+    def __init__(self, db_manager, collection: str = 'profile_jobs', lease_seconds: float = 300.0,
+                 max_attempts: int = 5, backoff_base: float = 60.0, backoff_max: float = 3600.0):
+        self.jobs = db_manager.db[collection]
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jobs.create_index([('status', ASCENDING), ('priority', DESCENDING), ('available_at', ASCENDING)])
+
+    def enqueue(self, username: str, priority: int = 0, tweet_limit: Optional[int] = None) -> bool:
+        """Queue a profile; returns False if it is already queued or running"""
+        now = datetime.now()
+        job = {
+            '_id': username,
+            'username': username,
+            'status': 'queued',
+            'priority': priority,
+            'tweet_limit': tweet_limit,
+            'attempts': 0,
+            'max_attempts': self.max_attempts,
+            'available_at': now,
+            'lease_owner': None,
+            'lease_expires': None,
+            'last_error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+        try:
+            self.jobs.insert_one(job)
+            return True
+        except DuplicateKeyError:
+            pass
+
+        # Finished or dead jobs start over, active ones only get their priority raised
+        job.pop('_id')
+        job.pop('created_at')
+        result = self.jobs.update_one(
+            {'_id': username, 'status': {'$nin': list(ACTIVE_STATUSES)}},
+            {'$set': job}
+        )
+        if result.modified_count:
+            return True
+        self.jobs.update_one({'_id': username}, {'$max': {'priority': priority}})
+        return False
+
+    def lease(self, worker_id: str) -> Optional[Dict]:
+        """Claim the highest-priority ready job, including ones whose lease has expired"""
+        now = datetime.now()
+        # Workers that died holding their last attempt leave the job in the dead-letter state
+        self.jobs.update_many(
+            {
+                'status': 'leased',
+                'lease_expires': {'$lt': now},
+                '$expr': {'$gte': ['$attempts', '$max_attempts']}
+            },
+            {'$set': {'status': 'dead', 'last_error': 'lease expired', 'updated_at': now}}
+        )
+        return self.jobs.find_one_and_update(
+            {'$or': [
+                {'status': 'queued', 'available_at': {'$lte': now}},
+                {'status': 'leased', 'lease_expires': {'$lt': now}}
+            ]},
+            {
+                '$set': {
+                    'status': 'leased',
+                    'lease_owner': worker_id,
+                    'lease_expires': now + timedelta(seconds=self.lease_seconds),
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('priority', DESCENDING), ('available_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def heartbeat(self, username: str, worker_id: str) -> bool:
+        """Extend a lease; False means another worker has taken the job over"""
+        now = datetime.now()
+        result = self.jobs.update_one(
+            {'_id': username, 'status': 'leased', 'lease_owner': worker_id},
+            {'$set': {'lease_expires': now + timedelta(seconds=self.lease_seconds), 'updated_at': now}}
+        )
+        return result.matched_count == 1
+
+    def complete(self, username: str, worker_id: str, result: Optional[Dict] = None) -> bool:
+        now = datetime.now()
+        outcome = self.jobs.update_one(
+            {'_id': username, 'status': 'leased', 'lease_owner': worker_id},
+            {'$set': {
+                'status': 'done',
+                'result': result or {},
+                'lease_owner': None,
+                'lease_expires': None,
+                'finished_at': now,
+                'updated_at': now
+            }}
+        )
+        return outcome.matched_count == 1
+
+    def fail(self, username: str, worker_id: str, error: str) -> Optional[str]:
+        """Record a failed attempt; returns the job's new status"""
+        job = self.jobs.find_one({'_id': username, 'status': 'leased', 'lease_owner': worker_id})
+        if job is None:
+            return None
+        now = datetime.now()
+        update = {'lease_owner': None, 'lease_expires': None, 'last_error': error, 'updated_at': now}
+        if job['attempts'] >= job['max_attempts']:
+            update['status'] = 'dead'
+        else:
+            update['status'] = 'queued'
+            update['available_at'] = now + timedelta(
+                seconds=retry_delay(job['attempts'], self.backoff_base, self.backoff_max)
+            )
+        self.jobs.update_one({'_id': username, 'lease_owner': worker_id}, {'$set': update})
+        return update['status']
+
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        return list(self.jobs.find({'status': 'dead'}).sort('updated_at', DESCENDING).limit(limit))
+
+    def requeue(self, username: str) -> bool:
+        """Give a dead job a fresh set of attempts"""
+        result = self.jobs.update_one(
+            {'_id': username, 'status': 'dead'},
+            {'$set': {'status': 'queued', 'attempts': 0, 'available_at': datetime.now(), 'last_error': None}}
+        )
+        return result.modified_count == 1
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in ('queued', 'leased', 'done', 'dead')}
+        for row in self.jobs.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]):
+            counts[row['_id']] = row['count']
+        return counts
+
+
+class SQLiteJobQueue:
+    """The same job queue in a local SQLite file, for single-box runs with several worker processes"""
+
+    def __init__(self, path: str = 'jobs.db', lease_seconds: float = 300.0, max_attempts: int = 5,
+                 backoff_base: float = 60.0, backoff_max: float = 3600.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    username TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    tweet_limit INTEGER,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    last_error TEXT,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, available_at)')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per call keeps the queue usable from threads and separate processes
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _job(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def enqueue(self, username: str, priority: int = 0, tweet_limit: Optional[int] = None) -> bool:
+        """Queue a profile; returns False if it is already queued or running"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT status FROM jobs WHERE username = ?', (username,)).fetchone()
+            if row and row['status'] in ACTIVE_STATUSES:
+                conn.execute('UPDATE jobs SET priority = MAX(priority, ?) WHERE username = ?', (priority, username))
+                conn.execute('COMMIT')
+                return False
+            conn.execute(
+                """INSERT OR REPLACE INTO jobs
+                   (username, status, priority, tweet_limit, attempts, max_attempts, available_at,
+                    created_at, updated_at)
+                   VALUES (?, 'queued', ?, ?, 0, ?, ?, ?, ?)""",
+                (username, priority, tweet_limit, self.max_attempts, now, now, now)
+            )
+            conn.execute('COMMIT')
+            return True
+
+    def lease(self, worker_id: str) -> Optional[Dict]:
+        """Claim the highest-priority ready job, including ones whose lease has expired"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                """UPDATE jobs SET status = 'dead', last_error = 'lease expired', updated_at = ?
+                   WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts""",
+                (now, now)
+            )
+            row = conn.execute(
+                """SELECT username FROM jobs
+                   WHERE (status = 'queued' AND available_at <= ?)
+                      OR (status = 'leased' AND lease_expires < ?)
+                   ORDER BY priority DESC, available_at ASC LIMIT 1""",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                """UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                   attempts = attempts + 1, updated_at = ? WHERE username = ?""",
+                (worker_id, now + self.lease_seconds, now, row['username'])
+            )
+            job = conn.execute('SELECT * FROM jobs WHERE username = ?', (row['username'],)).fetchone()
+            conn.execute('COMMIT')
+            return self._job(job)
+
+    def heartbeat(self, username: str, worker_id: str) -> bool:
+        """Extend a lease; False means another worker has taken the job over"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET lease_expires = ?, updated_at = ?
+                   WHERE username = ? AND status = 'leased' AND lease_owner = ?""",
+                (now + self.lease_seconds, now, username, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, username: str, worker_id: str, result: Optional[Dict] = None) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL,
+                   updated_at = ? WHERE username = ? AND status = 'leased' AND lease_owner = ?""",
+                (json.dumps(result or {}, default=str), now, username, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, username: str, worker_id: str, error: str) -> Optional[str]:
+        """Record a failed attempt; returns the job's new status"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE username = ? AND status = 'leased' AND lease_owner = ?",
+                (username, worker_id)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            if row['attempts'] >= row['max_attempts']:
+                status, available_at = 'dead', now
+            else:
+                status = 'queued'
+                available_at = now + retry_delay(row['attempts'], self.backoff_base, self.backoff_max)
+            conn.execute(
+                """UPDATE jobs SET status = ?, available_at = ?, last_error = ?, lease_owner = NULL,
+                   lease_expires = NULL, updated_at = ? WHERE username = ?""",
+                (status, available_at, error, now, username)
+            )
+            conn.execute('COMMIT')
+            return status
+
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [self._job(row) for row in rows]
+
+    def requeue(self, username: str) -> bool:
+        """Give a dead job a fresh set of attempts"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, last_error = NULL
+                   WHERE username = ? AND status = 'dead'""",
+                (time.time(), username)
+            )
+            return cursor.rowcount == 1
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status: 0 for status in ('queued', 'leased', 'done', 'dead')}
+        with self._connect() as conn:
+            for row in conn.execute('SELECT status, COUNT(*) AS count FROM jobs GROUP BY status'):
+                counts[row['status']] = row['count']
+        return counts
+
+
+class QueueWorker:
+    """Pulls profile jobs off a queue and scrapes them with one engine, heartbeating while it works"""
+
+    def __init__(self, queue, engine, worker_id: Optional[str] = None, tweet_limit: Optional[int] = None,
+                 heartbeat_interval: float = 60.0, poll_interval: float = 15.0,
+                 on_result: Optional[Callable[[Dict], None]] = None):
+        self.queue = queue
+        self.engine = engine
+        self.worker_id = worker_id or default_worker_id()
+        self.tweet_limit = tweet_limit
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        # Called with each job's outcome, e.g. to report back to a supervisor process
+        self.on_result = on_result
+        self.stats = {'done': 0, 'failed': 0, 'tweets': 0}
+
+    async def _heartbeat(self, username: str, task: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not await asyncio.to_thread(self.queue.heartbeat, username, self.worker_id):
+                logging.warning(f"Lost the lease on @{username}, abandoning it")
+                task.cancel()
+                return
+
+    async def _scrape(self, job: Dict) -> int:
+        tweet_limit = job.get('tweet_limit') or self.tweet_limit
+        count = 0
+        async for _ in self.engine.iter_profile(job['username'], tweet_limit):
+            count += 1
+        return count
+
+    async def run_job(self, job: Dict):
+        username = job['username']
+        logging.info(f"Worker {self.worker_id} leased @{username} (attempt {job['attempts']})")
+        started = time.monotonic()
+        task = asyncio.create_task(self._scrape(job))
+        heartbeat = asyncio.create_task(self._heartbeat(username, task))
+        try:
+            count = await task
+            error = self.engine.profile_errors.get(username)
+        except asyncio.CancelledError:
+            if heartbeat.done():
+                return
+            raise
+        except Exception as e:
+            count, error = 0, str(e)
+        finally:
+            heartbeat.cancel()
+
+        result = {'tweets': count, 'seconds': round(time.monotonic() - started, 1), 'worker': self.worker_id}
+        if error:
+            status = await asyncio.to_thread(self.queue.fail, username, self.worker_id, error)
+            self.stats['failed'] += 1
+            logging.warning(f"@{username} failed ({error}), job is now {status}")
+            result.update(status=status, error=error)
+        else:
+            await asyncio.to_thread(self.queue.complete, username, self.worker_id, result)
+            self.stats['done'] += 1
+            self.stats['tweets'] += count
+            result['status'] = 'done'
+        if self.on_result:
+            self.on_result(dict(result, username=username))
+
+    async def run(self, stop_when_empty: bool = True) -> Dict:
+        """Work through jobs until the queue is drained, or forever with ``stop_when_empty=False``.
+
+        The queue only counts as drained once nothing is queued (including
+        jobs waiting out a backoff) or leased, so a job held by a crashed
+        worker is picked up when its lease expires.
+        """
+        owns_pool = self.engine.pool is None
+        await self.engine.start()
+        try:
+            while True:
+                job = await asyncio.to_thread(self.queue.lease, self.worker_id)
+                if job is None:
+                    if stop_when_empty:
+                        counts = await asyncio.to_thread(self.queue.stats)
+                        if not counts['queued'] and not counts['leased']:
+                            break
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self.run_job(job)
+        finally:
+            if owns_pool:
+                await self.engine.close()
+        logging.info(f"Worker {self.worker_id} finished: {self.stats}")
+        return self.stats
@@ -1,35 +1,271 @@
-import requests
-from scraper import TwitterScraper
-from proxy_manager import ProxyManager
-
-def test_proxy():
-    proxy_manager = ProxyManager()
-    proxy = proxy_manager.get_proxy()
-    
-    proxies = {
-        'http': f"http://{proxy['username']}:{proxy['password']}@{proxy['server'].replace('http://', '')}",
-        'https': f"http://{proxy['username']}:{proxy['password']}@{proxy['server'].replace('http://', '')}"
-    }
-    
-    try:
-        response = requests.get(
-            'https://geo.brdtest.com/welcome.txt?product=isp&method=native',
-            proxies=proxies
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import queue as queue_module
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from .async_scraper import AsyncTwitterScraper
+from .checkpoint import FileCheckpointStore
+from .db_manager import DatabaseManager
+from .exporter import COMPRESSIONS, FORMATS, TweetExporter
+from .job_queue import MongoJobQueue, QueueWorker, SQLiteJobQueue
+from .proxy_manager import ProxyManager, proxy_key
+from .analysis import TweetAnalyzer
+from .search_index import LocalSearchIndex
+
+
+def read_profiles(values: List[str]) -> List[str]:
+    """Usernames from files (one per line, '#' comments allowed) or given directly"""
+    usernames = []
+    for value in values:
+        path = Path(value)
+        lines = path.read_text(encoding='utf-8').splitlines() if path.is_file() else [value]
+        for line in lines:
+            username = line.split('#', 1)[0].strip().lstrip('@')
+            if username and username not in usernames:
+                usernames.append(username)
+    return usernames
+
+
+def open_queue(args, db_manager=None):
+    if args.mongo_queue:
+        return MongoJobQueue(db_manager or DatabaseManager(), lease_seconds=args.lease_seconds)
+    return SQLiteJobQueue(args.queue, lease_seconds=args.lease_seconds)
+
+
+def load_unique_proxies() -> List[Dict]:
+    """The configured proxies once each, in load order, so slicing them never hands one to two workers.
+
+    load_proxies returns them raw; a proxy in both .env and a proxy file would otherwise count twice.
+    """
+    unique = {}
+    for proxy in ProxyManager(proxies=[]).load_proxies():
+        unique.setdefault(proxy_key(proxy), proxy)
+    return list(unique.values())
+
+
+def cap_workers(workers: int, proxy_count: int) -> int:
+    """At most one worker per exit IP, so each IP keeps its scheduler's request rate.
+
+    Workers don't coordinate their rate limiters; two workers behind one proxy
+    (or both going direct) would hit Twitter at twice the intended rate.
+    """
+    exit_ips = max(1, proxy_count)
+    if workers > exit_ips:
+        logging.warning(f"--workers {workers} capped to {exit_ips}: only {proxy_count} proxies loaded "
+                        f"and workers must not share an IP")
+        return exit_ips
+    return workers
+
+
+def assign_proxies(proxies: List[Dict], index: int, workers: int) -> List[Dict]:
+    """Give each worker its own slice of the pool; see cap_workers for why slices never overlap"""
+    return proxies[index::workers]
+
+
+def worker_main(index: int, args: argparse.Namespace, results):
+    """Entry point of one worker process: its own browser pool, proxies and DB connection"""
+    db_manager = DatabaseManager()
+    proxy_manager = ProxyManager(proxies=assign_proxies(load_unique_proxies(), index, args.workers))
+    engine = AsyncTwitterScraper(
+        db_manager=db_manager,
+        proxy_manager=proxy_manager,
+        max_concurrency=1,
+        headless=not args.headed,
+        checkpoint_store=FileCheckpointStore()
+    )
+    worker = QueueWorker(
+        open_queue(args, db_manager),
+        engine,
+        tweet_limit=args.tweet_limit,
+        poll_interval=5.0,
+        on_result=lambda result: results.put(dict(result, worker_index=index))
+    )
+    asyncio.run(worker.run())
+
+
+class Supervisor:
+    """Runs N worker processes over the job queue, restarting any that crash"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.ctx = multiprocessing.get_context('spawn')
+        self.results = self.ctx.Queue()
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.restarts = Counter()
+        self.collected: List[Dict] = []
+
+    def _spawn(self, index: int):
+        process = self.ctx.Process(
+            target=worker_main,
+            args=(index, self.args, self.results),
+            name=f"scrape-worker-{index}"
         )
-        print(f"Proxy Test Response: {response.text}")
-        return True
-    except Exception as e:
-        print(f"Proxy Test Failed: {str(e)}")
-        return False
-
-def main():
-    if test_proxy():
-        scraper = TwitterScraper()
-        username = "elonmusk"  # example username
-        tweets = scraper.scrape_profile(username, tweet_limit=100)
-        scraper.save_tweets(tweets, username)
-    else:
-        print("Please check your proxy configuration")
+        process.start()
+        self.processes[index] = process
+        logging.info(f"Started worker {index} (pid {process.pid})")
+
+    def _drain_results(self):
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue_module.Empty:
+                return
+            self.collected.append(result)
+            logging.info(f"@{result['username']}: {result['status']}, {result['tweets']} tweets in {result['seconds']}s")
+
+    def run(self) -> List[Dict]:
+        started = time.monotonic()
+        for index in range(self.args.workers):
+            self._spawn(index)
+
+        while self.processes:
+            self._drain_results()
+            for index, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del self.processes[index]
+                if process.exitcode == 0:
+                    continue
+                if self.restarts[index] < self.args.max_restarts:
+                    self.restarts[index] += 1
+                    logging.warning(f"Worker {index} exited with {process.exitcode}, restart {self.restarts[index]}/{self.args.max_restarts}")
+                    self._spawn(index)
+                else:
+                    logging.error(f"Worker {index} exited with {process.exitcode}, giving up on it")
+            time.sleep(1.0)
+
+        self._drain_results()
+        self.print_summary(time.monotonic() - started)
+        return self.collected
+
+    def print_summary(self, elapsed: float):
+        done = [r for r in self.collected if r['status'] == 'done']
+        failed = [r for r in self.collected if r['status'] != 'done']
+        tweets = sum(r['tweets'] for r in self.collected)
+        per_worker = Counter(r['worker_index'] for r in done)
+
+        print(f"\nScraped {len(done)} profiles ({len(failed)} failed attempts) with {self.args.workers} workers in {elapsed:.1f}s")
+        print(f"Tweets: {tweets} ({tweets / elapsed if elapsed else 0:.2f}/s, "
+              f"{len(done) / elapsed * 60 if elapsed else 0:.1f} profiles/min)")
+        for index in sorted(per_worker):
+            print(f"  worker {index}: {per_worker[index]} profiles, {self.restarts[index]} restarts")
+        for result in sorted(done, key=lambda r: r['seconds'], reverse=True):
+            print(f"  @{result['username']}: {result['tweets']} tweets in {result['seconds']}s")
+        for result in failed:
+            print(f"  @{result['username']}: {result['status']} ({result.get('error')})")
+        print(f"Queue: {open_queue(self.args).stats()}")
+
+
+def add_queue_options(parser: argparse.ArgumentParser):
+    parser.add_argument('--workers', type=int, default=max(1, multiprocessing.cpu_count() // 2),
+                        help="worker processes, each with its own browser and proxies")
+    parser.add_argument('--tweet-limit', type=int, default=None, help="tweets per profile (default: all)")
+    parser.add_argument('--queue', default='jobs.db', help="SQLite job queue file")
+    parser.add_argument('--mongo-queue', action='store_true', help="use the shared MongoDB job queue instead")
+    parser.add_argument('--lease-seconds', type=float, default=300.0)
+    parser.add_argument('--max-restarts', type=int, default=3, help="restarts per crashed worker")
+    parser.add_argument('--headed', action='store_true', help="show the browsers")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='xscrape', description="Scrape Twitter profiles into MongoDB")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scrape = commands.add_parser('scrape', help="queue profiles and scrape them with a pool of worker processes")
+    scrape.add_argument('--profiles', nargs='+', required=True,
+                        help="usernames, or files with one username per line")
+    scrape.add_argument('--priority', type=int, default=0)
+    add_queue_options(scrape)
+
+    work = commands.add_parser('work', help="join an existing queue, e.g. the MongoDB one from another machine")
+    add_queue_options(work)
+
+    rebuild = commands.add_parser('rebuild-stats', help="recompute profile counters from the tweets collection")
+    rebuild.add_argument('--profiles', nargs='+', help="usernames or files (default: every profile)")
+
+    commands.add_parser('backfill-timestamps', help="derive missing tweet timestamps from their IDs, then rebuild profile stats")
+
+    export = commands.add_parser('export', help="stream stored tweets to JSONL, CSV or Parquet files")
+    export.add_argument('--user', help="only this username")
+    export.add_argument('--since', type=datetime.fromisoformat, help="tweets at or after this date (YYYY-MM-DD)")
+    export.add_argument('--until', type=datetime.fromisoformat, help="tweets before this date (YYYY-MM-DD)")
+    export.add_argument('--format', choices=FORMATS, default='jsonl')
+    export.add_argument('--compression', choices=[c for c in COMPRESSIONS if c], default=None)
+    export.add_argument('--chunk-size', type=int, default=5000, help="tweets per part file")
+    export.add_argument('--output-dir', default='exports')
+    export.add_argument('--name', help="export directory name (default: from the filters)")
+    export.add_argument('--restart', action='store_true', help="fail instead of resuming an existing export")
+
+    search = commands.add_parser('search', help="keyword search over stored tweets, best matches first")
+    search.add_argument('query')
+    search.add_argument('--user', help="only this username")
+    search.add_argument('--since', type=datetime.fromisoformat, help="tweets at or after this date (YYYY-MM-DD)")
+    search.add_argument('--until', type=datetime.fromisoformat, help="tweets before this date (YYYY-MM-DD)")
+    search.add_argument('--page', type=int, default=1)
+    search.add_argument('--page-size', type=int, default=20)
+    search.add_argument('--comments', action='store_true', help="search comment text instead of tweets")
+    search.add_argument('--local', action='store_true', help="use the SQLite index at SEARCH_INDEX_PATH")
+
+    index = commands.add_parser('build-search-index', help="index every stored tweet and comment into a local SQLite file")
+    index.add_argument('--path', default='search.db', help="index file; set SEARCH_INDEX_PATH to it to keep it updated")
+
+    args = parser.parse_args(argv)
+    log_dir = Path("logs")
+    log_dir.mkdir(exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(log_dir / "scraper.log"), logging.StreamHandler()]
+    )
+
+    if args.command == 'rebuild-stats':
+        usernames = read_profiles(args.profiles) if args.profiles else None
+        DatabaseManager().rebuild_profile_stats(usernames)
+        return
+
+    if args.command == 'backfill-timestamps':
+        db_manager = DatabaseManager()
+        print(f"Backfilled timestamps: {db_manager.backfill_timestamps()}")
+        db_manager.rebuild_profile_stats()
+        return
+
+    if args.command == 'build-search-index':
+        print(f"Indexed {LocalSearchIndex(args.path).rebuild_from(DatabaseManager())} into {args.path}")
+        return
+
+    if args.command == 'search':
+        results = TweetAnalyzer().search(args.query, args.user, args.since, args.until, args.page,
+                                         args.page_size, args.comments, args.local)
+        for result in results:
+            author = result.get('username') or result.get('author', {}).get('username')
+            print(f"[{result['score']:.2f}] @{author} {result['tweet_id']} ({result.get('timestamp')})")
+            print(f"  {result['content'][:200]}")
+        print(f"{len(results)} results on page {args.page}")
+        return
+
+    if args.command == 'export':
+        exporter = TweetExporter(output_dir=args.output_dir, fmt=args.format,
+                                 compression=args.compression, chunk_size=args.chunk_size)
+        manifest = exporter.export(args.user, args.since, args.until, name=args.name, resume=not args.restart)
+        print(f"Exported {manifest['rows']} in {manifest['parts']} parts")
+        return
+
+    if args.command == 'scrape':
+        job_queue = open_queue(args)
+        usernames = read_profiles(args.profiles)
+        queued = sum(job_queue.enqueue(username, args.priority, args.tweet_limit) for username in usernames)
+        print(f"Queued {queued} of {len(usernames)} profiles ({len(usernames) - queued} already pending)")
+
+    args.workers = cap_workers(args.workers, len(load_unique_proxies()))
+    Supervisor(args).run()
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,18 +1,222 @@
+import json
+import logging
 import os
-from typing import Dict
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
+# Files the pool reads proxies from, relative to the working directory
+DEFAULT_SOURCES = ('proxies.json', 'isp_proxies.json', 'ips-isp_proxy1.txt')
+
+# Template entries shipped in the sample proxy files
+PLACEHOLDER_MARKERS = ('example.com', 'your-username', 'your-password')
+
+
+def proxy_key(proxy: Optional[Dict]) -> str:
+    """Stable identifier of a proxy, shared with BrowserPool and RequestScheduler"""
+    if not proxy:
+        return 'direct'
+    return f"{proxy.get('server')}|{proxy.get('username')}"
+
+
+class ProxyState:
+    """Health of one proxy: latency and error EWMAs, ban count and cool-down"""
+
+    def __init__(self, proxy: Dict):
+        self.proxy = proxy
+        self.key = proxy_key(proxy)
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.bans = 0
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.cooldown_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def health(self) -> float:
+        """Higher is better: mostly error-free, then fast"""
+        latency = self.latency if self.latency is not None else 1.0
+        return max(1.0 - self.error_rate, 0.05) / (1.0 + latency)
+
+
 class ProxyManager:
-    def __init__(self):
+    """Pool of proxies from .env and the proxy files, chosen by health.
+
+    Callers report each request's outcome. Proxies that keep failing or get
+    banned sit out an exponentially growing cool-down before they are
+    offered again.
+    """
+
+    def __init__(self, proxies: Optional[List[Dict]] = None, sources=DEFAULT_SOURCES,
+                 ewma_alpha: float = 0.3, max_failures: int = 3,
+                 cooldown_base: float = 30.0, cooldown_max: float = 1800.0):
         load_dotenv()
+        self.ewma_alpha = ewma_alpha
+        self.max_failures = max_failures
+        self.cooldown_base = cooldown_base
+        self.cooldown_max = cooldown_max
+        self._lock = threading.Lock()
+        self._states: Dict[str, ProxyState] = {}
+
+        if proxies is None:
+            proxies = self.load_proxies(sources)
+        for proxy in proxies:
+            key = proxy_key(proxy)
+            if key not in self._states:
+                self._states[key] = ProxyState(proxy)
+        logging.info(f"Proxy pool loaded {len(self._states)} proxies")
+        # Kept for callers that only ever used the single .env proxy
         self.proxy = self.load_proxy()
 
-    def load_proxy(self) -> Dict:
+    def load_proxy(self) -> Optional[Dict]:
+        """The proxy configured in .env, if any"""
+        if not os.getenv('PROXY_HOST'):
+            return None
         return {
             "server": f"http://{os.getenv('PROXY_HOST')}:{os.getenv('PROXY_PORT')}",
             "username": os.getenv('PROXY_USERNAME'),
             "password": os.getenv('PROXY_PASSWORD')
         }
 
-    def get_proxy(self) -> Dict:
-        return self.proxy 
\ No newline at end of file
+    def load_proxies(self, sources=DEFAULT_SOURCES) -> List[Dict]:
+        proxies = []
+        env_proxy = self.load_proxy()
+        if env_proxy:
+            proxies.append(env_proxy)
+        for source in sources:
+            path = Path(source)
+            if not path.exists():
+                continue
+            try:
+                if path.suffix == '.json':
+                    loaded = self._load_json(path)
+                else:
+                    loaded = self._load_lines(path)
+            except (OSError, ValueError) as e:
+                logging.error(f"Could not load proxies from {path}: {str(e)}")
+                continue
+            proxies.extend(p for p in loaded if not self._is_placeholder(p))
+        return proxies
+
+    @staticmethod
+    def _load_json(path: Path) -> List[Dict]:
+        """Entries with either a full ``server`` URL or separate ``host``/``port``"""
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        proxies = []
+        for entry in entries:
+            server = entry.get('server') or f"http://{entry.get('host')}:{entry.get('port')}"
+            proxies.append({
+                "server": server,
+                "username": entry.get('username'),
+                "password": entry.get('password')
+            })
+        return proxies
+
+    @staticmethod
+    def _load_lines(path: Path) -> List[Dict]:
+        """One ``host:port:username:password`` per line"""
+        proxies = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.strip().split(':', 3)
+                if len(parts) != 4:
+                    continue
+                host, port, username, password = parts
+                proxies.append({
+                    "server": f"http://{host}:{port}",
+                    "username": username,
+                    "password": password
+                })
+        return proxies
+
+    @staticmethod
+    def _is_placeholder(proxy: Dict) -> bool:
+        values = ' '.join(str(v) for v in proxy.values())
+        return any(marker in values for marker in PLACEHOLDER_MARKERS)
+
+    def get_proxy(self) -> Optional[Dict]:
+        """A healthy proxy, weighted by health; None means connect directly"""
+        with self._lock:
+            if not self._states:
+                return None
+            now = time.monotonic()
+            available = [s for s in self._states.values() if s.available(now)]
+            if not available:
+                state = min(self._states.values(), key=lambda s: s.cooldown_until)
+                logging.warning(f"All proxies cooling down, using {state.key} early")
+                return state.proxy
+            state = random.choices(available, weights=[s.health() for s in available])[0]
+            return state.proxy
+
+    def report_success(self, key: str, latency: float):
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            state.requests += 1
+            state.latency = latency if state.latency is None else (
+                self.ewma_alpha * latency + (1 - self.ewma_alpha) * state.latency
+            )
+            state.error_rate *= (1 - self.ewma_alpha)
+            state.consecutive_failures = 0
+            state.trips = 0
+
+    def report_failure(self, key: str, ban: bool = False, reason: str = ''):
+        """Record a failed request; a ban or repeated failures start a cool-down"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            state.requests += 1
+            state.errors += 1
+            state.error_rate = self.ewma_alpha + (1 - self.ewma_alpha) * state.error_rate
+            state.consecutive_failures += 1
+            if ban:
+                state.bans += 1
+            if ban or state.consecutive_failures >= self.max_failures:
+                cooldown = min(self.cooldown_base * 2 ** state.trips, self.cooldown_max)
+                state.trips += 1
+                state.consecutive_failures = 0
+                state.cooldown_until = time.monotonic() + cooldown
+                logging.warning(f"Proxy {key} cooling down for {cooldown:.0f}s ({reason or 'repeated failures'})")
+
+    def rest(self, key: str, seconds: Optional[float] = None) -> bool:
+        """Take a healthy proxy out of rotation for a while so get_proxy hands out another.
+
+        Unlike a failure this leaves its health alone. Returns False, resting
+        nothing, when no other proxy is available to take over.
+        """
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return False
+            now = time.monotonic()
+            if not any(other.available(now) for other in self._states.values() if other is not state):
+                return False
+            state.cooldown_until = max(state.cooldown_until, now + (seconds or self.cooldown_base))
+            return True
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-proxy health, without credentials"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: {
+                    'requests': state.requests,
+                    'errors': state.errors,
+                    'bans': state.bans,
+                    'error_rate': state.error_rate,
+                    'latency_ewma': state.latency,
+                    'health': state.health(),
+                    'cooldown_remaining': max(0.0, state.cooldown_until - now),
+                }
+                for key, state in self._states.items()
+            }
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations instead of blocking.
+
+    ``reserve()`` always takes a token and returns how long the caller must
+    wait before using it, so asyncio tasks and threads can share one bucket
+    and are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RequestScheduler:
+    """One token bucket per proxy: every navigation waits for a token from its own IP's bucket.
+
+    Defaults follow the PRD: one request per 5 seconds per IP, rotating
+    after 100 requests. Proxies never wait on each other, so throughput
+    grows with the number of proxies.
+    """
+
+    def __init__(self, interval: float = 5.0, burst: int = 1, rotate_every: int = 100):
+        self.interval = interval
+        self.burst = burst
+        self.rotate_every = rotate_every
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def unlimited(cls) -> 'RequestScheduler':
+        """No spacing at all, for local fixtures and tests"""
+        return cls(interval=0, rotate_every=0)
+
+    def _reserve(self, key: str) -> float:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate = 1.0 / self.interval if self.interval > 0 else 0
+                bucket = self._buckets[key] = TokenBucket(rate, self.burst)
+                self._stats[key] = {'requests': 0, 'since_rotation': 0, 'rotations': 0,
+                                    'waited': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+            delay = bucket.reserve()
+            stats = self._stats[key]
+            stats['requests'] += 1
+            stats['since_rotation'] += 1
+            if delay > 0:
+                stats['waited'] += 1
+                stats['wait_total'] += delay
+                stats['wait_max'] = max(stats['wait_max'], delay)
+            return delay
+
+    async def acquire(self, key: str) -> float:
+        """Wait for a request slot on ``key``'s proxy; returns the time waited"""
+        delay = self._reserve(key)
+        if delay > 0:
+            logging.debug(f"Waiting {delay:.2f}s for a request slot on {key}")
+            await asyncio.sleep(delay)
+        return delay
+
+    def acquire_sync(self, key: str) -> float:
+        """Blocking variant of acquire() for threaded callers"""
+        delay = self._reserve(key)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def rotation_due(self, key: str) -> bool:
+        """Whether ``key`` has served ``rotate_every`` requests since it last rotated"""
+        if not self.rotate_every:
+            return False
+        with self._lock:
+            stats = self._stats.get(key)
+            return bool(stats) and stats['since_rotation'] >= self.rotate_every
+
+    def mark_rotated(self, key: str):
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats:
+                stats['since_rotation'] = 0
+                stats['rotations'] += 1
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Requests, waits and rotations per proxy"""
+        with self._lock:
+            return {
+                key: dict(stats, wait_avg=stats['wait_total'] / stats['requests'] if stats['requests'] else 0.0)
+                for key, stats in self._stats.items()
+            }
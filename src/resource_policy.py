@@ -0,0 +1,118 @@
+import logging
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+# Requests the scraper never needs: telemetry, ads and third-party trackers
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    '/jot/',
+    'client_event.json',
+    'analytics.twitter.com',
+    'ads-twitter.com',
+    'ads-api.twitter.com',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'scribe.twitter.com',
+)
+
+
+class ResourcePolicy:
+    """Which resource types and URL patterns a scraping page may load"""
+
+    def __init__(self, blocked_resource_types: Iterable[str] = ('image', 'media', 'font'),
+                 blocked_url_patterns: Iterable[str] = DEFAULT_BLOCKED_URL_PATTERNS):
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.blocked_url_patterns = tuple(blocked_url_patterns)
+
+    @classmethod
+    def full(cls) -> 'ResourcePolicy':
+        """Load everything, like a normal browser"""
+        return cls(blocked_resource_types=(), blocked_url_patterns=())
+
+    @classmethod
+    def lightweight(cls) -> 'ResourcePolicy':
+        """Skip images, video, fonts and trackers. Stylesheets stay because
+        the text extraction reads computed styles."""
+        return cls()
+
+    @property
+    def blocks_anything(self) -> bool:
+        return bool(self.blocked_resource_types or self.blocked_url_patterns)
+
+    def should_block(self, request) -> bool:
+        if request.resource_type in self.blocked_resource_types:
+            return True
+        url = request.url
+        return any(pattern in url for pattern in self.blocked_url_patterns)
+
+
+class TrafficMonitor:
+    """Applies a ResourcePolicy to one context and counts what it let through.
+
+    Bytes are measured from finished requests rather than by interception;
+    the route is only installed when the policy blocks something, because
+    Playwright turns off the HTTP cache for routed contexts.
+    """
+
+    def __init__(self, policy: Optional[ResourcePolicy] = None):
+        self.policy = policy or ResourcePolicy.full()
+        self.requests_allowed = 0
+        self.requests_blocked = 0
+        self.bytes_received = 0
+        self.blocked_by_type = Counter()
+        self.navigations = 0
+        self.navigation_time = 0.0
+        self._context = None
+        self._routed = False
+
+    async def attach(self, context):
+        self._context = context
+        self._routed = self.policy.blocks_anything
+        if self._routed:
+            await context.route("**/*", self._route)
+        context.on("requestfinished", self._on_request_finished)
+        return self
+
+    async def detach(self):
+        """Remove the route and listener so a recycled context starts clean"""
+        if self._context is None:
+            return
+        try:
+            if self._routed:
+                await self._context.unroute("**/*", self._route)
+            self._context.remove_listener("requestfinished", self._on_request_finished)
+        except Exception as e:
+            logging.debug(f"Could not detach traffic monitor: {str(e)}")
+        self._context = None
+
+    async def _route(self, route):
+        request = route.request
+        if self.policy.should_block(request):
+            self.requests_blocked += 1
+            self.blocked_by_type[request.resource_type] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _on_request_finished(self, request):
+        self.requests_allowed += 1
+        try:
+            sizes = await request.sizes()
+            self.bytes_received += sizes['responseBodySize'] + sizes['responseHeadersSize']
+        except Exception:
+            pass
+
+    def record_navigation(self, started: float):
+        self.navigations += 1
+        self.navigation_time += time.monotonic() - started
+
+    def get_stats(self) -> Dict:
+        return {
+            'requests_allowed': self.requests_allowed,
+            'requests_blocked': self.requests_blocked,
+            'bytes_received': self.bytes_received,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'navigations': self.navigations,
+            'avg_navigation_time': self.navigation_time / self.navigations if self.navigations else 0.0,
+        }
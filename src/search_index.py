@@ -0,0 +1,162 @@
+import logging
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS docs (
+        id INTEGER PRIMARY KEY,
+        tweet_id TEXT NOT NULL UNIQUE,
+        kind TEXT NOT NULL,
+        username TEXT,
+        parent_id TEXT,
+        timestamp REAL,
+        content TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS docs_user_time ON docs (username, timestamp);
+    CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+        content, content='docs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+        INSERT INTO docs_fts (rowid, content) VALUES (new.id, new.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+        INSERT INTO docs_fts (docs_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS docs_au AFTER UPDATE OF content ON docs BEGIN
+        INSERT INTO docs_fts (docs_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO docs_fts (rowid, content) VALUES (new.id, new.content);
+    END;
+"""
+
+# Only rewrites (and re-tokenises) a row when its content or metadata really changed
+UPSERT = """
+    INSERT INTO docs (tweet_id, kind, username, parent_id, timestamp, content)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (tweet_id) DO UPDATE SET
+        kind = excluded.kind, username = excluded.username, parent_id = excluded.parent_id,
+        timestamp = excluded.timestamp, content = excluded.content
+    WHERE docs.content IS NOT excluded.content OR docs.timestamp IS NOT excluded.timestamp
+        OR docs.username IS NOT excluded.username
+"""
+
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    """Stored timestamps are naive UTC; keep them as epoch seconds for range filters"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def match_expression(query: str) -> str:
+    """Quote every term so user input can't break FTS5 syntax; terms are ANDed"""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class LocalSearchIndex:
+    """Inverted index of tweet and comment text in a local SQLite FTS5 file, ranked by BM25"""
+
+    def __init__(self, path: str = 'search.db'):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per call, like SQLiteJobQueue, so write-behind threads and worker processes can share the file
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def add_documents(self, docs: List[Dict], kind: str = 'tweet') -> int:
+        """Index stored tweet/comment documents; unchanged ones are left alone. Returns rows written"""
+        rows = [
+            (
+                doc['tweet_id'],
+                kind,
+                (doc.get('author') or {}).get('username'),
+                doc.get('parent_id'),
+                _epoch(doc.get('timestamp')),
+                doc['content'],
+            )
+            for doc in docs if doc.get('tweet_id') and doc.get('content')
+        ]
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            before = conn.total_changes
+            conn.executemany(UPSERT, rows)
+            written = conn.total_changes - before
+            conn.execute('COMMIT')
+        return written
+
+    def search(self, query: str, username: Optional[str] = None, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, kinds=('tweet',), page: int = 1,
+               page_size: int = 20) -> List[Dict]:
+        """Best BM25 matches first, with the same filters and paging as DatabaseManager.search_tweets"""
+        expression = match_expression(query)
+        if not expression:
+            return []
+
+        sql = ["""SELECT d.tweet_id, d.kind, d.username, d.parent_id, d.timestamp, d.content,
+                         -bm25(docs_fts) AS score
+                  FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid
+                  WHERE docs_fts MATCH ?"""]
+        params = [expression]
+        if username:
+            sql.append('AND d.username = ?')
+            params.append(username)
+        if since:
+            sql.append('AND d.timestamp >= ?')
+            params.append(_epoch(since))
+        if until:
+            sql.append('AND d.timestamp < ?')
+            params.append(_epoch(until))
+        if kinds:
+            sql.append(f"AND d.kind IN ({', '.join('?' for _ in kinds)})")
+            params.extend(kinds)
+        sql.append('ORDER BY bm25(docs_fts) LIMIT ? OFFSET ?')
+        params.extend([page_size, (page - 1) * page_size])
+
+        with self._connect() as conn:
+            rows = conn.execute(' '.join(sql), params).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            if result['timestamp'] is not None:
+                result['timestamp'] = datetime.fromtimestamp(result['timestamp'], tz=timezone.utc).replace(tzinfo=None)
+            results.append(result)
+        return results
+
+    def rebuild_from(self, db_manager, batch_size: int = 1000) -> Dict[str, int]:
+        """Index everything already in MongoDB, streaming each collection in batches"""
+        indexed = {}
+        projection = {'_id': 0, 'tweet_id': 1, 'author.username': 1, 'parent_id': 1, 'timestamp': 1, 'content': 1}
+        for kind, collection in (('tweet', db_manager.tweets), ('comment', db_manager.comments)):
+            indexed[kind] = 0
+            batch = []
+            for doc in collection.find({}, projection).batch_size(batch_size):
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    indexed[kind] += self.add_documents(batch, kind)
+                    batch = []
+            indexed[kind] += self.add_documents(batch, kind)
+        logging.info(f"Search index {self.path} rebuilt: {indexed}")
+        return indexed
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return {row['kind']: row['count'] for row in
+                    conn.execute('SELECT kind, COUNT(*) AS count FROM docs GROUP BY kind')}
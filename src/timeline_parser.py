@@ -0,0 +1,157 @@
+import html
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+# GraphQL operations whose responses carry tweets we care about
+TIMELINE_ENDPOINTS = ('/UserTweets', '/UserTweetsAndReplies', '/UserMedia', '/TweetDetail')
+
+# Nested tweets that belong to another tweet rather than the timeline itself
+NESTED_TWEET_KEYS = ('quoted_status_result', 'retweeted_status_result')
+
+
+def is_timeline_response(url: str) -> bool:
+    path = url.split('?', 1)[0]
+    return '/graphql/' in path and path.endswith(TIMELINE_ENDPOINTS)
+
+
+def parse_created_at(value: Optional[str]) -> Optional[datetime]:
+    """Parse Twitter's 'Wed Oct 10 20:19:24 +0000 2018' timestamps"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%a %b %d %H:%M:%S %z %Y')
+    except ValueError:
+        logging.debug(f"Unparseable created_at: {value}")
+        return None
+
+
+def _iter_tweet_results(node) -> Iterator[Dict]:
+    """Yield every tweet result object in a GraphQL payload, skipping quoted/retweeted copies"""
+    if isinstance(node, dict):
+        typename = node.get('__typename')
+        if typename == 'TweetWithVisibilityResults' and 'tweet' in node:
+            yield node['tweet']
+            return
+        if typename == 'Tweet' and 'legacy' in node:
+            yield node
+            return
+        for key, value in node.items():
+            if key in NESTED_TWEET_KEYS:
+                continue
+            yield from _iter_tweet_results(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _iter_tweet_results(item)
+
+
+def _screen_name(result: Dict) -> Optional[str]:
+    user = result.get('core', {}).get('user_results', {}).get('result', {})
+    return (
+        user.get('core', {}).get('screen_name') or
+        user.get('legacy', {}).get('screen_name')
+    )
+
+
+def _full_text(result: Dict) -> str:
+    note = result.get('note_tweet', {}).get('note_tweet_results', {}).get('result', {})
+    if note.get('text'):
+        return html.unescape(note['text'])
+
+    legacy = result['legacy']
+    text = legacy.get('full_text', '')
+    # full_text carries a trailing t.co link for attached media
+    display_range = legacy.get('display_text_range')
+    if display_range and len(display_range) == 2:
+        text = text[display_range[0]:display_range[1]]
+    return html.unescape(text)
+
+
+def _media(legacy: Dict) -> List[Dict]:
+    media = []
+    entities = legacy.get('extended_entities') or legacy.get('entities') or {}
+    for item in entities.get('media', []):
+        if item.get('type') == 'photo':
+            media.append({'type': 'image', 'url': item.get('media_url_https')})
+            continue
+
+        variants = [
+            v for v in item.get('video_info', {}).get('variants', [])
+            if v.get('content_type') == 'video/mp4'
+        ]
+        if variants:
+            best = max(variants, key=lambda v: v.get('bitrate', 0))
+            media.append({'type': 'video', 'url': best.get('url')})
+        else:
+            media.append({'type': 'video', 'url': item.get('media_url_https')})
+    return media
+
+
+def tweet_from_result(result: Dict) -> Optional[Dict]:
+    """Convert one GraphQL tweet result into the dict DatabaseManager.save_tweets expects"""
+    legacy = result.get('legacy') or {}
+    tweet_id = result.get('rest_id') or legacy.get('id_str')
+    if not tweet_id:
+        return None
+
+    screen_name = _screen_name(result)
+    return {
+        'id': tweet_id,
+        'url': f"/{screen_name}/status/{tweet_id}" if screen_name else None,
+        'text': _full_text(result).strip(),
+        'likes': int(legacy.get('favorite_count', 0)),
+        'retweets': int(legacy.get('retweet_count', 0)),
+        'replies': int(legacy.get('reply_count', 0)),
+        'timestamp': parse_created_at(legacy.get('created_at')),
+        'author': screen_name,
+        'conversation_id': legacy.get('conversation_id_str'),
+        'in_reply_to': legacy.get('in_reply_to_status_id_str'),
+        'is_thread': 'self_thread' in legacy,
+        'media': _media(legacy)
+    }
+
+
+def parse_timeline_payload(payload: Dict) -> List[Dict]:
+    """All tweets in a UserTweets/TweetDetail response, in document order, deduped by ID"""
+    tweets = []
+    seen = set()
+    for result in _iter_tweet_results(payload.get('data', payload)):
+        try:
+            tweet = tweet_from_result(result)
+        except Exception as e:
+            logging.error(f"Error parsing tweet result: {str(e)}")
+            continue
+        if tweet and tweet['id'] not in seen:
+            seen.add(tweet['id'])
+            tweets.append(tweet)
+    return tweets
+
+
+class ResponseCapture:
+    """Collects tweets from timeline and conversation API responses seen by a page"""
+
+    def __init__(self):
+        self.pending: List[Dict] = []
+        self.responses = 0
+        self.errors = 0
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+        return self
+
+    async def _on_response(self, response):
+        if not is_timeline_response(response.url) or response.status != 200:
+            return
+        try:
+            payload = await response.json()
+        except Exception as e:
+            self.errors += 1
+            logging.debug(f"Could not read timeline response {response.url}: {str(e)}")
+            return
+        self.responses += 1
+        self.pending.extend(parse_timeline_payload(payload))
+
+    def drain(self) -> List[Dict]:
+        """Tweets captured since the last call"""
+        tweets, self.pending = self.pending, []
+        return tweets
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Any tweet article rendered on a timeline or status page
+ARTICLE_SELECTOR = 'article[data-testid="tweet"]'
+
+# True once the page grew taller or rendered more articles than before the scroll
+CONTENT_GREW_JS = """
+([height, count]) =>
+    document.documentElement.scrollHeight > height ||
+    document.querySelectorAll('article[data-testid="tweet"]').length > count
+"""
+
+CONTENT_SIZE_JS = """
+() => [
+    document.documentElement.scrollHeight,
+    document.querySelectorAll('article[data-testid="tweet"]').length
+]
+"""
+
+
+class TimingPolicy:
+    """How long the scraper waits, and a record of every wait it made.
+
+    Waits resolve on a page signal (new articles, a selector appearing or
+    going away) and give up after a timeout instead of sleeping a fixed time. The
+    human-like jitter that follows is configured separately so it can be
+    tuned, or switched off for fixture runs, without touching the timeouts.
+    """
+
+    def __init__(self, jitter_min: float = 0.5, jitter_max: float = 1.5,
+                 content_timeout: float = 8.0, selector_timeout: float = 10.0,
+                 page_timeout: float = 15.0):
+        self.jitter_min = jitter_min
+        self.jitter_max = max(jitter_min, jitter_max)
+        self.content_timeout = content_timeout
+        self.selector_timeout = selector_timeout
+        # First render of a freshly navigated profile page
+        self.page_timeout = page_timeout
+        self.waits: Dict[str, Dict] = {}
+
+    @classmethod
+    def default(cls) -> 'TimingPolicy':
+        return cls()
+
+    @classmethod
+    def fast(cls) -> 'TimingPolicy':
+        """No jitter and short timeouts, for local fixtures and tests"""
+        return cls(jitter_min=0.0, jitter_max=0.0, content_timeout=1.0,
+                   selector_timeout=2.0, page_timeout=2.0)
+
+    def record(self, name: str, waited: float, timed_out: bool = False):
+        stats = self.waits.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+        stats['count'] += 1
+        stats['total'] += waited
+        stats['max'] = max(stats['max'], waited)
+        if timed_out:
+            stats['timeouts'] += 1
+
+    async def jitter(self, name: str):
+        """Human-like pause between actions"""
+        delay = random.uniform(self.jitter_min, self.jitter_max)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.record(f"{name}.jitter", delay)
+
+    async def _timed(self, name: str, waiter, timeout: float) -> bool:
+        started = time.monotonic()
+        try:
+            await waiter(timeout * 1000)
+            timed_out = False
+        except PlaywrightTimeoutError:
+            timed_out = True
+            logging.debug(f"Wait '{name}' timed out after {timeout}s")
+        self.record(name, time.monotonic() - started, timed_out)
+        return not timed_out
+
+    async def content_size(self, page):
+        """Page height and article count, the baseline for wait_for_growth"""
+        return await page.evaluate(CONTENT_SIZE_JS)
+
+    async def wait_for_growth(self, page, baseline, name: str = 'scroll',
+                              timeout: Optional[float] = None) -> bool:
+        """Wait until new articles render or the page grows past ``baseline``"""
+        return await self._timed(
+            name,
+            lambda ms: page.wait_for_function(CONTENT_GREW_JS, arg=list(baseline), timeout=ms),
+            timeout or self.content_timeout
+        )
+
+    async def wait_for_selector(self, page, selector: str = ARTICLE_SELECTOR, name: str = 'selector',
+                                timeout: Optional[float] = None, state: str = 'visible') -> bool:
+        """Wait until ``selector`` reaches ``state``, e.g. 'detached' once a clicked link is gone"""
+        return await self._timed(
+            name,
+            lambda ms: page.wait_for_selector(selector, state=state, timeout=ms),
+            timeout or self.selector_timeout
+        )
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {
+            name: dict(stats, avg=stats['total'] / stats['count'] if stats['count'] else 0.0)
+            for name, stats in self.waits.items()
+        }
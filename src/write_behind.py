@@ -0,0 +1,133 @@
+import atexit
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class WriteBehindSink:
+    """Buffers scraped tweets and flushes them to MongoDB every N tweets or T seconds.
+
+    Writes happen on a background thread so neither the event loop nor a
+    synchronous consumer waits on Atlas. If Atlas falls behind, ``add`` blocks
+    once ``max_buffered`` tweets are waiting, so memory stays bounded instead of
+    growing with every scraped tweet. ``close()`` flushes whatever is left
+    and is also registered with ``atexit`` in case the caller never gets there.
+    """
+
+    def __init__(self, db_manager, username: str, flush_every: int = 100,
+                 flush_interval: float = 30.0, track_high_water_mark: bool = True,
+                 on_flush: Optional[Callable[[List[Dict]], None]] = None,
+                 max_buffered: Optional[int] = None):
+        self.db_manager = db_manager
+        self.username = username
+        self.flush_every = flush_every
+        self.max_buffered = max_buffered or 4 * flush_every
+        self.flush_interval = flush_interval
+        self.track_high_water_mark = track_high_water_mark
+        # Called with each batch once it is stored, e.g. to checkpoint progress
+        self.on_flush = on_flush
+        self._buffer: List[Dict] = []
+        # Already stored tweets seen again, written as metric updates only
+        self._observed: List[Dict] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_flush = time.monotonic()
+        self.flushes = 0
+        self.written = 0
+        self.summary = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'changed': 0, 'failed': 0, 'observed': 0}
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{username}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, tweet: Dict):
+        """Queue a tweet for saving, blocking while max_buffered tweets are already waiting"""
+        self._enqueue(tweet, observed=False)
+
+    def observe(self, tweet: Dict):
+        """Queue a stored tweet's fresh metrics; its content and related documents are left as they are"""
+        self._enqueue(tweet, observed=True)
+
+    def has_room(self) -> bool:
+        """Whether add/observe would return without waiting for the writer"""
+        with self._cond:
+            return self._pending() < self.max_buffered
+
+    def _enqueue(self, tweet: Dict, observed: bool):
+        with self._cond:
+            while not self._closed and self._pending() >= self.max_buffered:
+                self._cond.wait()
+            if self._closed:
+                raise RuntimeError("WriteBehindSink is closed")
+            (self._observed if observed else self._buffer).append(tweet)
+            if self._pending() >= self.flush_every:
+                # Producers blocked on a full buffer share the condition, so wake everyone
+                self._cond.notify_all()
+
+    def _pending(self) -> int:
+        return len(self._buffer) + len(self._observed)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and self._pending() < self.flush_every:
+                    remaining = self._last_flush + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._buffer = self._buffer, []
+                observed, self._observed = self._observed, []
+                closing = self._closed
+                self._last_flush = time.monotonic()
+                self._cond.notify_all()
+
+            if batch:
+                self._write(batch)
+            if observed:
+                self._write_metrics(observed)
+            if closing:
+                return
+
+    def _write(self, batch: List[Dict]):
+        try:
+            summary = self.db_manager.save_tweets(batch, self.username) or {}
+            # Only advance the high-water mark once the whole batch is stored
+            if not summary.get('failed'):
+                if self.track_high_water_mark:
+                    self.db_manager.update_high_water_mark(self.username, [t.get('id') for t in batch])
+                if self.on_flush:
+                    self.on_flush(batch)
+        except Exception as e:
+            logging.error(f"Write-behind flush of {len(batch)} tweets for @{self.username} failed: {str(e)}")
+            summary = {'failed': len(batch)}
+        self.flushes += 1
+        self.written += len(batch)
+        for key, value in summary.items():
+            self.summary[key] = self.summary.get(key, 0) + value
+
+    def _write_metrics(self, observed: List[Dict]):
+        try:
+            summary = self.db_manager.update_metrics(observed, self.username) or {}
+            failed = summary.get('failed', 0)
+        except Exception as e:
+            logging.error(f"Metric update of {len(observed)} known tweets for @{self.username} failed: {str(e)}")
+            failed = len(observed)
+        self.summary['observed'] += len(observed) - failed
+        self.summary['failed'] += failed
+
+    def close(self):
+        """Flush remaining tweets and stop the writer thread"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+        logging.info(f"Write-behind sink for @{self.username}: {self.written} tweets in {self.flushes} flushes, {self.summary}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,168 @@
+import asyncio
+import tempfile
+from src.async_scraper import AsyncTwitterScraper
+from src.checkpoint import FileCheckpointStore
+from src.extraction import BATCH_EXTRACT_JS
+from src.proxy_manager import ProxyManager
+from src.rate_limiter import RequestScheduler
+from src.timing import TimingPolicy, CONTENT_SIZE_JS
+
+# Newest first, like a profile timeline; each scroll renders the next five
+TIMELINE = [str(1790000000000000100 - i) for i in range(15)]
+PER_SCROLL = 5
+
+
+class FakePage:
+    """Just enough of a Playwright page for batch extraction over TIMELINE.
+
+    Like BATCH_EXTRACT_JS, each rendered tweet is returned by one evaluate only.
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.rendered = PER_SCROLL
+        self.read = set()
+
+    async def goto(self, url):
+        return None
+
+    async def wait_for_selector(self, selector, timeout=None, state=None):
+        return True
+
+    async def wait_for_function(self, expression, arg=None, timeout=None):
+        return True
+
+    async def query_selector(self, selector):
+        return None
+
+    async def evaluate(self, expression, *args):
+        if expression == BATCH_EXTRACT_JS:
+            fresh = [tweet_id for tweet_id in TIMELINE[:self.rendered] if tweet_id not in self.read]
+            self.read.update(fresh)
+            return [
+                {'id': tweet_id, 'url': f"/fixtureuser/status/{tweet_id}", 'author': "fixtureuser",
+                 'text': f"tweet {tweet_id}", 'metrics': {'like': "3"}, 'media': [], 'is_thread': False}
+                for tweet_id in fresh
+            ]
+        if expression == CONTENT_SIZE_JS:
+            return [self.rendered * 100, self.rendered]
+        if 'scrollTo' in expression:
+            self.rendered += PER_SCROLL
+        return None
+
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage(self)
+
+    async def route(self, *args):
+        pass
+
+    async def unroute(self, *args):
+        pass
+
+    def on(self, *args):
+        pass
+
+    def remove_listener(self, *args):
+        pass
+
+
+class FakePool:
+    async def acquire(self):
+        return FakeContext()
+
+    async def release(self, context):
+        pass
+
+    def proxy_key(self, context):
+        return 'direct'
+
+    def retire(self, key):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self, known=(), broken=False):
+        self.known = set(known)
+        self.broken = broken
+        self.saved = []
+        self.observed = []
+
+    def get_known_tweet_ids(self, username):
+        return set(self.known)
+
+    def save_tweets(self, tweets, username):
+        if self.broken:
+            raise ConnectionError("database unreachable")
+        self.saved.extend(tweets)
+        return {'inserted': len(tweets)}
+
+    def update_metrics(self, tweets, username):
+        self.observed.extend(tweets)
+        return {'updated': len(tweets), 'unchanged': 0, 'failed': 0}
+
+    def update_high_water_mark(self, username, tweet_ids):
+        pass
+
+
+def make_engine(db, **options) -> AsyncTwitterScraper:
+    engine = AsyncTwitterScraper(
+        db_manager=db,
+        proxy_manager=ProxyManager(proxies=[]),
+        comment_limit=0,
+        detail_workers=0,
+        timing_policy=TimingPolicy.fast(),
+        scheduler=RequestScheduler.unlimited(),
+        **options
+    )
+    engine.pool = FakePool()
+    return engine
+
+
+def scrape(engine, tweet_limit):
+    async def run():
+        return [tweet['id'] async for tweet in engine.iter_profile("fixtureuser", tweet_limit)]
+    return asyncio.run(run())
+
+
+def test_resume_skips_do_not_use_up_limit():
+    store = FileCheckpointStore(tempfile.mkdtemp())
+    store.save_profile("fixtureuser", {'seen_ids': TIMELINE[:3]})
+    engine = make_engine(FakeDatabase(), incremental=False, checkpoint_store=store)
+
+    assert scrape(engine, tweet_limit=3) == TIMELINE[3:6], "the tweets right after the checkpoint are kept"
+    print("✅ Resume skips don't use up the tweet limit: SUCCESS")
+    return True
+
+
+def test_known_and_new_in_one_batch():
+    # Stored tweets interleaved with new ones inside the first rendered batch
+    known = [TIMELINE[0], TIMELINE[2], TIMELINE[3]]
+    db = FakeDatabase(known)
+    engine = make_engine(db, stop_after_known=5)
+
+    tweets = scrape(engine, tweet_limit=3)
+    assert tweets == [TIMELINE[1], TIMELINE[4], TIMELINE[5]], tweets
+    assert [tweet['id'] for tweet in db.saved] == tweets
+    assert [tweet['id'] for tweet in db.observed] == known, "known tweets still get their metrics refreshed"
+    print("✅ Known tweets mixed with new ones in one batch: SUCCESS")
+    return True
+
+
+def test_failed_saves_are_profile_errors():
+    engine = make_engine(FakeDatabase(broken=True))
+
+    assert len(scrape(engine, tweet_limit=3)) == 3
+    assert engine.profile_errors["fixtureuser"] == "3 tweets failed to save"
+    print("✅ Failed saves reported as a profile error: SUCCESS")
+    return True
+
+
+if __name__ == "__main__":
+    test_resume_skips_do_not_use_up_limit()
+    test_known_and_new_in_one_batch()
+    test_failed_saves_are_profile_errors()
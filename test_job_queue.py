@@ -0,0 +1,114 @@
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+from src.job_queue import SQLiteJobQueue, QueueWorker
+
+
+def make_queue(**options) -> SQLiteJobQueue:
+    path = Path(tempfile.mkdtemp()) / "jobs.db"
+    return SQLiteJobQueue(str(path), **options)
+
+
+def test_lease_is_exclusive():
+    queue = make_queue()
+    usernames = [f"user{i}" for i in range(50)]
+    for username in usernames:
+        queue.enqueue(username)
+    assert not queue.enqueue("user0"), "an active job must not be queued twice"
+
+    leased = []
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        while True:
+            job = queue.lease(worker_id)
+            if job is None:
+                return
+            with lock:
+                leased.append(job['username'])
+            queue.complete(job['username'], worker_id, {'tweets': 1})
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(leased) == sorted(usernames), "every job leased exactly once"
+    assert queue.stats()['done'] == 50
+    print("✅ Concurrent leasing without duplicates: SUCCESS")
+    return True
+
+
+def test_priority_backoff_and_dead_letter():
+    queue = make_queue(max_attempts=2, backoff_base=0.2, lease_seconds=0.2)
+    queue.enqueue("low", priority=0)
+    queue.enqueue("high", priority=5)
+    assert queue.lease("w1")['username'] == "high"
+
+    # A failed attempt goes back to the queue only after its backoff
+    assert queue.fail("high", "w1", "rate limited") == 'queued'
+    assert queue.lease("w1")['username'] == "low"
+    assert queue.lease("w2") is None
+    time.sleep(0.25)
+    job = queue.lease("w2")
+    assert job['username'] == "high" and job['attempts'] == 2
+
+    # The second failure exhausts max_attempts
+    assert queue.fail("high", "w2", "rate limited") == 'dead'
+    assert [job['username'] for job in queue.dead_letters()] == ["high"]
+
+    # "low" was never completed: its lease expires and another worker picks it up
+    assert not queue.heartbeat("low", "w2")
+    time.sleep(0.25)
+    assert queue.lease("w3")['username'] == "low"
+    assert not queue.complete("low", "w1"), "a worker that lost its lease cannot complete the job"
+    assert queue.complete("low", "w3")
+
+    assert queue.requeue("high")
+    assert queue.stats() == {'queued': 1, 'leased': 0, 'done': 1, 'dead': 0}
+    print("✅ Priority, backoff and dead-lettering: SUCCESS")
+    return True
+
+
+class FakeEngine:
+    """Scrapes a fixed number of tweets per profile and fails one profile"""
+
+    def __init__(self):
+        self.pool = None
+        self.profile_errors = {}
+
+    async def start(self):
+        self.pool = object()
+
+    async def close(self):
+        self.pool = None
+
+    async def iter_profile(self, username, tweet_limit=None):
+        self.profile_errors.pop(username, None)
+        if username == "broken":
+            self.profile_errors[username] = "login wall"
+            return
+        for i in range(3):
+            yield {'id': f"{username}-{i}"}
+
+
+def test_worker_runs_queue():
+    queue = make_queue(max_attempts=1)
+    for username in ("alice", "bob", "broken"):
+        queue.enqueue(username)
+
+    stats = asyncio.run(QueueWorker(queue, FakeEngine(), worker_id="w1").run())
+    assert stats == {'done': 2, 'failed': 1, 'tweets': 6}, stats
+    assert queue.stats() == {'queued': 0, 'leased': 0, 'done': 2, 'dead': 1}
+    assert queue.dead_letters()[0]['last_error'] == "login wall"
+    print("✅ Queue worker: SUCCESS")
+    return True
+
+
+if __name__ == "__main__":
+    test_lease_is_exclusive()
+    test_priority_backoff_and_dead_letter()
+    test_worker_runs_queue()
@@ -0,0 +1,142 @@
+import json
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from src.timeline_parser import parse_timeline_payload, is_timeline_response
+from src.extraction import tweet_from_entry, snowflake_time
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the profile page for any path and the saved UserTweets payload for the API"""
+
+    def do_GET(self):
+        if is_timeline_response(self.path):
+            body = (FIXTURES / "UserTweets.json").read_bytes()
+            content_type = "application/json"
+        else:
+            body = (FIXTURES / "profile.html").read_bytes()
+            content_type = "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server():
+    server = HTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FixtureSink:
+    """Stands in for DatabaseManager so the capture test needs no MongoDB"""
+
+    def __init__(self):
+        self.saved = []
+
+    def save_tweets(self, tweets, username):
+        self.saved.extend(tweets)
+        return {'inserted': len(tweets)}
+
+    def get_known_tweet_ids(self, username):
+        return set()
+
+    def update_high_water_mark(self, username, tweet_ids):
+        pass
+
+
+def test_parse_fixture():
+    payload = json.loads((FIXTURES / "UserTweets.json").read_text())
+    tweets = parse_timeline_payload(payload)
+
+    ids = [t['id'] for t in tweets]
+    assert ids == ["1790000000000000003", "1790000000000000002", "1790000000000000001"], ids
+
+    long_tweet, photo_tweet, video_tweet = tweets
+    assert not long_tweet['text'].endswith('…')
+    assert len(long_tweet['text']) > 280
+    assert long_tweet['likes'] == 1204 and long_tweet['retweets'] == 310 and long_tweet['replies'] == 45
+    assert long_tweet['timestamp'].isoformat() == "2024-05-14T12:00:00+00:00"
+
+    assert photo_tweet['text'] == "Look at this chart & tell me what you see"
+    assert photo_tweet['media'] == [{'type': 'image', 'url': "https://pbs.twimg.com/media/fixture1.jpg"}]
+
+    assert video_tweet['is_thread'] is True
+    assert video_tweet['media'] == [{'type': 'video', 'url': "https://video.twimg.com/high.mp4"}]
+    print("✅ Timeline fixture parsing: SUCCESS")
+    return True
+
+
+def test_dom_timestamps():
+    entry = {'id': "1790000000000000003", 'text': "hello", 'time': "2024-05-14T12:00:00.000Z"}
+    assert tweet_from_entry(entry)['timestamp'].isoformat() == "2024-05-14T12:00:00+00:00"
+
+    # Without a <time> element the snowflake ID still dates the tweet
+    del entry['time']
+    assert tweet_from_entry(entry)['timestamp'].isoformat() == "2024-05-13T12:43:51.248000+00:00"
+    assert snowflake_time("20") is None, "pre-snowflake IDs carry no time"
+    print("✅ DOM timestamps with snowflake fallback: SUCCESS")
+    return True
+
+
+async def chromium_launch_error():
+    """Why Chromium cannot start here, or None when it can"""
+    from playwright.async_api import async_playwright, Error as PlaywrightError
+
+    async with async_playwright() as playwright:
+        try:
+            browser = await playwright.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            return str(e).splitlines()[0]
+        await browser.close()
+        return None
+
+
+def test_capture_from_local_server():
+    from src.async_scraper import AsyncTwitterScraper
+    from src.timing import TimingPolicy
+    from src.rate_limiter import RequestScheduler
+    from src.proxy_manager import ProxyManager
+    import asyncio
+
+    # Chromium binaries are not available everywhere the unit checks run
+    launch_error = asyncio.run(chromium_launch_error())
+    if launch_error:
+        print(f"⚠️ Skipping browser capture test: {launch_error}")
+        return True
+
+    server = start_fixture_server()
+    sink = FixtureSink()
+    engine = AsyncTwitterScraper(
+        db_manager=sink,
+        proxy_manager=ProxyManager(proxies=[]),
+        extraction_mode='network',
+        base_url=f"http://127.0.0.1:{server.server_port}",
+        comment_limit=0,
+        timing_policy=TimingPolicy.fast(),
+        scheduler=RequestScheduler.unlimited()
+    )
+
+    try:
+        tweets = asyncio.run(engine.scrape_profile("fixtureuser", tweet_limit=3))
+    finally:
+        server.shutdown()
+
+    assert [t['id'] for t in tweets] == [
+        "1790000000000000003", "1790000000000000002", "1790000000000000001"
+    ]
+    assert sink.saved == tweets
+    print("✅ Network capture against local server: SUCCESS")
+    return True
+
+
+if __name__ == "__main__":
+    test_parse_fixture()
+    test_dom_timestamps()
+    test_capture_from_local_server()
@@ -0,0 +1,123 @@
+import socket
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import requests
+from src.proxy_manager import ProxyManager, proxy_key
+
+
+def make_stub_proxy(status: int, delay: float = 0.0):
+    """A local 'proxy' that answers every request itself with a fixed status"""
+
+    class StubProxyHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = b"ok" if status == 200 else b"Rate limit exceeded"
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), StubProxyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fetch_through(manager: ProxyManager, proxy):
+    """Send one request through a proxy and report the outcome like the scraper does"""
+    key = proxy_key(proxy)
+    started = time.monotonic()
+    try:
+        response = requests.get("http://twitter.test/", proxies={'http': proxy['server']}, timeout=2)
+    except requests.RequestException as e:
+        manager.report_failure(key, reason=type(e).__name__)
+        return
+    if response.status_code == 429:
+        manager.report_failure(key, ban=True, reason="HTTP 429")
+    else:
+        manager.report_success(key, time.monotonic() - started)
+
+
+def test_proxy_health():
+    fast = make_stub_proxy(200)
+    slow = make_stub_proxy(200, delay=0.3)
+    banned = make_stub_proxy(429)
+    servers = {
+        'fast': f"http://127.0.0.1:{fast.server_port}",
+        'slow': f"http://127.0.0.1:{slow.server_port}",
+        'banned': f"http://127.0.0.1:{banned.server_port}",
+        'dead': f"http://127.0.0.1:{closed_port()}",
+    }
+    manager = ProxyManager(
+        proxies=[{'server': server, 'username': name, 'password': 'x'} for name, server in servers.items()],
+        cooldown_base=60
+    )
+
+    try:
+        for _ in range(3):
+            for name, server in servers.items():
+                fetch_through(manager, {'server': server, 'username': name})
+
+        stats = manager.get_stats()
+        by_name = {key.split('|')[1]: value for key, value in stats.items()}
+        assert by_name['banned']['bans'] >= 1 and by_name['banned']['cooldown_remaining'] > 0
+        assert by_name['dead']['cooldown_remaining'] > 0
+        assert by_name['fast']['cooldown_remaining'] == 0
+        assert by_name['fast']['health'] > by_name['slow']['health']
+
+        picks = [manager.get_proxy()['username'] for _ in range(200)]
+        assert set(picks) <= {'fast', 'slow'}
+        assert picks.count('fast') > picks.count('slow')
+        print("✅ Proxy health scoring and cool-down: SUCCESS")
+        return True
+    except AssertionError:
+        print(f"❌ Proxy health scoring failed: {manager.get_stats()}")
+        raise
+    finally:
+        for server in (fast, slow, banned):
+            server.shutdown()
+
+
+def test_cooldown_backoff():
+    manager = ProxyManager(
+        proxies=[{'server': 'http://127.0.0.1:1', 'username': 'only', 'password': 'x'}],
+        cooldown_base=10, cooldown_max=25
+    )
+    key = 'http://127.0.0.1:1|only'
+    cooldowns = []
+    for _ in range(3):
+        manager.report_failure(key, ban=True, reason="login wall")
+        cooldowns.append(round(manager.get_stats()[key]['cooldown_remaining']))
+    assert cooldowns == [10, 20, 25], cooldowns
+    # With everything cooling down the pool still hands out the proxy that recovers first
+    assert manager.get_proxy()['username'] == 'only'
+    print("✅ Exponential cool-down: SUCCESS")
+    return True
+
+
+def test_rotation_rest():
+    proxies = [{'server': 'http://127.0.0.1:1', 'username': name, 'password': 'x'} for name in ('a', 'b')]
+    manager = ProxyManager(proxies=proxies, cooldown_base=60)
+    assert manager.rest('http://127.0.0.1:1|a')
+    assert {manager.get_proxy()['username'] for _ in range(20)} == {'b'}, "the rested proxy is not handed out"
+    assert manager.get_stats()['http://127.0.0.1:1|a']['health'] == manager.get_stats()['http://127.0.0.1:1|b']['health']
+    # Nothing else to rotate to: the last available proxy stays in use
+    assert not manager.rest('http://127.0.0.1:1|b')
+    assert manager.get_proxy()['username'] == 'b'
+    print("✅ Rotation rests a proxy without penalising it: SUCCESS")
+    return True
+
+
+if __name__ == "__main__":
+    test_proxy_health()
+    test_cooldown_backoff()
+    test_rotation_rest()
@@ -0,0 +1,39 @@
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from src.search_index import LocalSearchIndex
+
+
+def tweet_doc(tweet_id, username, content, timestamp, **extra):
+    return dict(tweet_id=tweet_id, author={'username': username}, content=content, timestamp=timestamp, **extra)
+
+
+def test_local_search():
+    index = LocalSearchIndex(str(Path(tempfile.mkdtemp()) / "search.db"))
+    index.add_documents([
+        tweet_doc("1", "alice", "Bitcoin price rallies again, bitcoin bulls cheer", datetime(2024, 5, 1)),
+        tweet_doc("2", "alice", "Café owners talk about bitcoin payments", datetime(2024, 6, 1)),
+        tweet_doc("3", "bob", "Weekend hiking photos", datetime(2024, 6, 2)),
+    ])
+    index.add_documents([tweet_doc("c1", "carol", "bitcoin is a bubble", datetime(2024, 6, 3), parent_id="2")],
+                        kind='comment')
+
+    assert [r['tweet_id'] for r in index.search("bitcoin")] == ["1", "2"], "more mentions rank higher"
+    assert [r['tweet_id'] for r in index.search("cafe")] == ["2"], "diacritics are folded"
+    assert [r['tweet_id'] for r in index.search("bitcoin", since=datetime(2024, 5, 15))] == ["2"]
+    assert index.search("bitcoin", username="bob") == []
+    assert [r['parent_id'] for r in index.search("bitcoin", kinds=('comment',))] == ["2"]
+    assert index.search('") OR hiking') == [], "user input is quoted, not parsed as FTS syntax"
+    assert [r['tweet_id'] for r in index.search("bitcoin", page=2, page_size=1)] == ["2"]
+
+    # Re-adding unchanged documents writes nothing; edits replace the old terms
+    assert index.add_documents([tweet_doc("3", "bob", "Weekend hiking photos", datetime(2024, 6, 2))]) == 0
+    index.add_documents([tweet_doc("1", "alice", "Ethereum upgrade shipped", datetime(2024, 5, 1))])
+    assert [r['tweet_id'] for r in index.search("bitcoin")] == ["2"]
+    assert index.stats() == {'tweet': 3, 'comment': 1}
+    print("✅ Local full-text search: SUCCESS")
+    return True
+
+
+if __name__ == "__main__":
+    test_local_search()
@@ -1,64 +1,148 @@
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
+import argparse
 from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from src.db_manager import DatabaseManager, keyset_filter
 
-def view_stored_tweets():
-    # Load environment variables
-    load_dotenv()
-    
-    # Connect to MongoDB Atlas
-    client = MongoClient(os.getenv('MONGODB_URI'))
-    db = client['twitter_scraper']
-    tweets_collection = db['tweets']
-    
-    # Get all tweets
-    tweets = list(tweets_collection.find({}, {'_id': 0}))
-    
-    print(f"\nFound {len(tweets)} tweets in database:")
+# Only what the viewer prints; related threads, comments and media are fetched per page
+TWEET_PROJECTION = {
+    '_id': 0,
+    'tweet_id': 1,
+    'author.username': 1,
+    'content': 1,
+    'metrics': 1,
+    'is_thread': 1,
+    'timestamp': 1,
+    'scraped_at': 1,
+}
+
+
+def build_filter(username: Optional[str] = None, since: Optional[datetime] = None) -> Dict:
+    query = {}
+    if username:
+        query['author.username'] = username
+    if since:
+        query['timestamp'] = {'$gte': since}
+    return query
+
+
+def print_user_summary(db: DatabaseManager, query: Dict):
+    """Per-user counts and totals, grouped by the server rather than in Python"""
+    pipeline = [
+        {'$match': query},
+        {'$group': {
+            '_id': '$author.username',
+            'tweets': {'$sum': 1},
+            'likes': {'$sum': '$metrics.likes'},
+            'retweets': {'$sum': '$metrics.retweets'},
+            'replies': {'$sum': '$metrics.replies'},
+            'last_scraped_at': {'$max': '$scraped_at'},
+        }},
+        {'$sort': {'tweets': -1, '_id': 1}},
+    ]
+    total = 0
+    print(f"\n{'User':<20} {'Tweets':>8} {'Likes':>10} {'Retweets':>10} {'Replies':>10}  Last scraped")
+    print("-" * 80)
+    for row in db.tweets.aggregate(pipeline):
+        total += row['tweets']
+        print(f"@{row['_id']:<19} {row['tweets']:>8} {row['likes']:>10} {row['retweets']:>10} "
+              f"{row['replies']:>10}  {row.get('last_scraped_at') or 'Unknown'}")
+    print("-" * 80)
+    print(f"{total} tweets")
+
+
+def iter_pages(db: DatabaseManager, query: Dict, page_size: int = 20,
+               after: Optional[str] = None) -> Iterator[List[Dict]]:
+    """Pages of tweets, newest first, continuing below the tweet ``after`` if given.
+
+    Keyset pagination on (timestamp, tweet_id), which both the
+    (author.username, timestamp, tweet_id) and (timestamp, tweet_id) indexes
+    serve in order: each page is a fresh index scan starting below the
+    previous page's last tweet, so nothing is sorted in memory.
+    """
+    last = None
+    if after:
+        last = db.tweets.find_one({'tweet_id': after}, {'_id': 0, 'timestamp': 1, 'tweet_id': 1})
+        if not last:
+            raise ValueError(f"--after {after}: no such tweet stored")
+    while True:
+        page_query = query
+        if last:
+            page_query = {'$and': [query, keyset_filter(last.get('timestamp'), last['tweet_id'], descending=True)]}
+        page = list(db.tweets.find(page_query, TWEET_PROJECTION)
+                    .sort([('timestamp', -1), ('tweet_id', -1)]).limit(page_size))
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+
+def print_tweet(tweet: Dict):
+    print(f"\n@{tweet['author']['username']} - {tweet['tweet_id']} ({tweet.get('timestamp') or 'no timestamp'})")
     print("-" * 50)
-    
-    # Group tweets by username
-    tweets_by_user = {}
-    for tweet in tweets:
-        username = tweet['author']['username']
-        if username not in tweets_by_user:
-            tweets_by_user[username] = []
-        tweets_by_user[username].append(tweet)
-    
-    # Display tweets grouped by username
-    for username, user_tweets in tweets_by_user.items():
-        print(f"\nTweets from @{username}:")
-        print("=" * 50)
-        
-        for i, tweet in enumerate(user_tweets, 1):
-            print(f"\nTweet {i}:")
-            print("-" * 50)
-            print("Content:")
-            print(tweet.get('content', 'No content'))  # Show full content without truncation
-            print("\nMetrics:")
-            for metric, value in tweet.get('metrics', {}).items():
-                print(f"  {metric.capitalize()}: {value}")
-            
-            if tweet.get('is_thread'):
-                print("\nThis is a thread")
-                thread_tweets = tweet.get('thread_tweets', [])
-                if thread_tweets:
-                    print(f"  Contains {len(thread_tweets)} additional tweets")
-            
-            comments = tweet.get('comments', [])
-            if comments:
-                print(f"\nHas {len(comments)} comments")
-            
-            media = tweet.get('media', [])
-            if media:
-                print(f"\nContains {len(media)} media items")
-                for item in media:
-                    print(f"  Type: {item.get('type')}")
-                    print(f"  URL: {item.get('url')}")
-            
-            print(f"\nScraped at: {tweet.get('scraped_at', 'Unknown')}")
-            print("-" * 50)
+    print(tweet.get('content') or 'No content')
+    print("\nMetrics:")
+    for metric, value in tweet.get('metrics', {}).items():
+        print(f"  {metric.capitalize()}: {value}")
+
+    if tweet.get('is_thread'):
+        print("\nThis is a thread")
+        thread_tweets = tweet.get('thread_tweets', [])
+        if thread_tweets:
+            print(f"  Contains {len(thread_tweets)} additional tweets")
+
+    comments = tweet.get('comments', [])
+    if comments:
+        print(f"\nHas {len(comments)} comments")
+
+    media = tweet.get('media', [])
+    if media:
+        print(f"\nContains {len(media)} media items")
+        for item in media:
+            print(f"  Type: {item.get('type')}")
+            print(f"  URL: {item.get('url')}")
+
+    print(f"\nScraped at: {tweet.get('scraped_at', 'Unknown')}")
+
+
+def view_stored_tweets(username: Optional[str] = None, since: Optional[datetime] = None, limit: int = 20,
+                       page_size: int = 20, after: Optional[str] = None, summary_only: bool = False):
+    db = DatabaseManager()
+    query = build_filter(username, since)
+    print_user_summary(db, query)
+    if summary_only or limit <= 0:
+        return
+
+    shown = 0
+    last_id = None
+    for page in iter_pages(db, query, min(page_size, limit), after):
+        page = page[:limit - shown]
+        db.attach_related(page, thread=True, comments=True, media=True)
+        for tweet in page:
+            print_tweet(tweet)
+        shown += len(page)
+        last_id = page[-1]['tweet_id']
+        if shown >= limit:
+            break
+
+    print("-" * 50)
+    print(f"Showed {shown} tweets")
+    if shown == limit and last_id:
+        print(f"Next page: --after {last_id}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Browse stored tweets page by page")
+    parser.add_argument('--user', help="only this username")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="only tweets at or after this date (YYYY-MM-DD)")
+    parser.add_argument('--limit', type=int, default=20, help="tweets to print (0 for the summary only)")
+    parser.add_argument('--page-size', type=int, default=20, help="tweets fetched per query")
+    parser.add_argument('--after', help="continue after this tweet ID, as printed by the previous run")
+    parser.add_argument('--summary', action='store_true', help="print only the per-user summary")
+    args = parser.parse_args(argv)
+    view_stored_tweets(args.user, args.since, args.limit, args.page_size, args.after, args.summary)
+
 
 if __name__ == "__main__":
-    view_stored_tweets() 
\ No newline at end of file
+    main()